@@ -0,0 +1,96 @@
+"""Compare checkpoint size and serialization time of inline vs reference memory state.
+
+Simulates a long thread where every turn writes a checkpoint holding the
+full state, as MemorySaver does, and reports the totals for both
+memory_state_mode settings. The modes are run alternately for several
+repeats and the min and median serialization times are reported, since a
+single run is dominated by noise.
+
+    python benchmark_checkpoints.py --turns 200
+"""
+import argparse
+import statistics
+import time
+import uuid
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from lang_memgpt_local import _constants as constants
+from lang_memgpt_local._memory_cache import MemoryCache
+
+try:
+    from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+except ImportError:
+    from langgraph.serde.jsonplus import JsonPlusSerializer
+
+
+def make_memories(n_core: int, n_recall: int, memory_chars: int):
+    core = {f"fact_{i}": "x" * memory_chars for i in range(n_core)}
+    recall = [
+        {
+            constants.PAYLOAD_KEY: "y" * memory_chars,
+            constants.PATH_KEY: constants.INSERT_PATH.format(user_id="user", event_id=uuid.uuid4()),
+        }
+        for _ in range(n_recall)
+    ]
+    return core, recall
+
+
+def run(mode: str, turns: int, core: dict, recall: list, message_chars: int):
+    serde = JsonPlusSerializer()
+    cache = MemoryCache(load_core=None, load_recall=None)
+    if mode == "reference":
+        core_memories = cache.core_ref("user", constants.PATCH_PATH.format(user_id="user"), core)
+        recall_memories = cache.recall_ref("user", recall)
+    else:
+        core_memories = core
+        recall_memories = [x[constants.PAYLOAD_KEY] for x in recall]
+
+    messages = []
+    total_bytes, total_seconds, last_bytes = 0, 0.0, 0
+    for _ in range(turns):
+        messages += [HumanMessage(content="h" * message_chars), AIMessage(content="a" * message_chars)]
+        state = {
+            "messages": messages,
+            "core_memories": core_memories,
+            "recall_memories": recall_memories,
+            "final_response": None,
+        }
+        # Each of the four graph steps per turn writes a checkpoint
+        for _ in range(4):
+            start = time.perf_counter()
+            last_bytes = len(serde.dumps(state))
+            total_seconds += time.perf_counter() - start
+            total_bytes += last_bytes
+    return total_bytes, total_seconds, last_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--core", type=int, default=20, help="number of core memories")
+    parser.add_argument("--recall", type=int, default=5, help="number of recall memories")
+    parser.add_argument("--memory-chars", type=int, default=300)
+    parser.add_argument("--message-chars", type=int, default=300)
+    parser.add_argument("--repeats", type=int, default=5, help="runs per mode, interleaved")
+    args = parser.parse_args()
+
+    modes = ("inline", "reference")
+    core, recall = make_memories(args.core, args.recall, args.memory_chars)
+    for mode in modes:
+        run(mode, 20, core, recall, args.message_chars)  # warm up
+    sizes, times = {}, {mode: [] for mode in modes}
+    for _ in range(args.repeats):
+        for mode in modes:
+            total_bytes, total_seconds, last_bytes = run(mode, args.turns, core, recall, args.message_chars)
+            sizes[mode] = total_bytes, last_bytes
+            times[mode].append(total_seconds)
+    for mode in modes:
+        total_bytes, last_bytes = sizes[mode]
+        print(f"{mode:>9}: {total_bytes / 1e6:8.2f} MB written, last checkpoint {last_bytes / 1e3:.1f} KB, "
+              f"serializing min {min(times[mode]) * 1e3:.1f} ms / "
+              f"median {statistics.median(times[mode]) * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
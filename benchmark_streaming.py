@@ -0,0 +1,104 @@
+"""Compare CPU cost of the "tokens" and "events" streaming modes of Chat.
+
+Runs concurrent streams through a graph shaped like memgraph (an agent LLM
+node followed by a tagged response LLM node) backed by fake streaming chat
+models, so only the streaming machinery is measured. The modes are run
+alternately and the min and median CPU time per repeat are reported.
+
+    python benchmark_streaming.py --streams 50 --tokens 200
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from typing import AsyncIterator, List, Optional
+
+from langchain_core.language_models.chat_models import agenerate_from_stream
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, AnyMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import END, START, StateGraph, add_messages
+from typing_extensions import Annotated, TypedDict
+
+from lang_memgpt_local import _constants as constants
+from lang_memgpt_local.chat import Chat
+
+
+class State(TypedDict):
+    messages: Annotated[List[AnyMessage], add_messages]
+    final_response: Optional[str]
+
+
+class StreamingFakeChatModel(GenericFakeChatModel):
+    """Fake model streaming tokens inside ainvoke, like ChatOpenAI(streaming=True)."""
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        # Native async stream, so no executor hop per token skews the measurement
+        for chunk in self._stream(messages, stop=stop, **kwargs):
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        return await agenerate_from_stream(self._astream(messages, stop=stop, run_manager=run_manager, **kwargs))
+
+
+def build_graph(n_tokens: int):
+    def model():
+        text = " ".join(f"tok{i}" for i in range(n_tokens))
+        return StreamingFakeChatModel(messages=iter(lambda: AIMessage(content=text), None))
+
+    async def agent_llm(state: State):
+        return {"messages": await model().ainvoke(state["messages"])}
+
+    async def response_llm(state: State):
+        llm = model().with_config(tags=[constants.RESPONSE_STREAM_TAG])
+        return {"final_response": (await llm.ainvoke(state["messages"])).content}
+
+    builder = StateGraph(State)
+    builder.add_node("agent_llm", agent_llm)
+    builder.add_node("response_llm", response_llm)
+    builder.add_edge(START, "agent_llm")
+    builder.add_edge("agent_llm", "response_llm")
+    builder.add_edge("response_llm", END)
+    return builder.compile(checkpointer=MemorySaver())
+
+
+async def run(mode: str, graph, n_streams: int) -> int:
+    async def one():
+        chat = Chat(str(uuid.uuid4()), str(uuid.uuid4()), stream_mode=mode, graph=graph)
+        return sum([1 async for _ in chat.stream_response("hello")])
+
+    return sum(await asyncio.gather(*(one() for _ in range(n_streams))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--streams", type=int, default=50, help="concurrent streams")
+    parser.add_argument("--tokens", type=int, default=200, help="tokens per LLM response")
+    parser.add_argument("--repeats", type=int, default=5, help="runs per mode, interleaved")
+    args = parser.parse_args()
+
+    graph = build_graph(args.tokens)
+    modes = ("events", "tokens")
+    for mode in modes:
+        asyncio.run(run(mode, graph, 2))  # warm up
+    cpu = {mode: [] for mode in modes}
+    n_tokens = {}
+    for _ in range(args.repeats):
+        for mode in modes:
+            start = time.process_time()
+            n_tokens[mode] = asyncio.run(run(mode, graph, args.streams))
+            cpu[mode].append(time.process_time() - start)
+    for mode in modes:
+        best, median = min(cpu[mode]), statistics.median(cpu[mode])
+        print(f"{mode:>6}: {best / args.streams * 1e3:7.2f} ms CPU/stream min, "
+              f"{median / args.streams * 1e3:7.2f} ms median, "
+              f"{best / n_tokens[mode] * 1e6:7.1f} us CPU/response token min "
+              f"({n_tokens[mode] // args.streams} tokens/stream)")
+
+
+if __name__ == "__main__":
+    main()
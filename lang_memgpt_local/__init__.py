@@ -1,5 +1,12 @@
 """Simple example memory extraction service."""
 
-from lang_memgpt_local.graph import memgraph
-
 __all__ = ["memgraph"]
+
+
+def __getattr__(name: str):
+    # Compiling the graph pulls prompts from the hub, so only do it on first use
+    if name == "memgraph":
+        from lang_memgpt_local.graph import memgraph
+
+        return memgraph
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
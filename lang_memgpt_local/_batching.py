@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Generic, List, Tuple, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class MicroBatcher(Generic[T, R]):
+    """Dynamic micro-batching scheduler.
+
+    Items submitted concurrently from any thread or event loop are collected
+    into one batch of up to `max_batch_size` items, waiting at most
+    `max_wait_ms` after the first item, and handed to `fn` on a pool of
+    `max_workers` threads. A new batch is only formed once a worker is free,
+    so batches grow with load instead of queueing up behind busy workers.
+    Items cancelled before their batch runs are dropped from it.
+
+    Args:
+        fn: Function mapping a list of items to a list of results of the same length.
+        max_batch_size: Maximum number of items per batch.
+        max_wait_ms: Maximum time to wait for more items after the first one.
+        max_workers: Number of threads running `fn` concurrently.
+        name: Thread name prefix, for debugging.
+    """
+
+    def __init__(
+        self,
+        fn: Callable[[List[T]], List[R]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        max_workers: int = 1,
+        name: str = "micro-batcher",
+    ):
+        self.fn = fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: queue.SimpleQueue[Tuple[T, Future]] = queue.SimpleQueue()
+        self._slots = threading.Semaphore(max_workers)
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix=name)
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._busy_seconds = 0.0
+        self._started = time.monotonic()
+        threading.Thread(target=self._dispatch, name=f"{name}-dispatcher", daemon=True).start()
+
+    def submit(self, item: T) -> Future:
+        fut: Future = Future()
+        self._queue.put((item, fut))
+        return fut
+
+    def __call__(self, item: T) -> R:
+        return self.submit(item).result()
+
+    async def acall(self, item: T) -> R:
+        return await asyncio.wrap_future(self.submit(item))
+
+    def _dispatch(self):
+        while True:
+            self._slots.acquire()
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._executor.submit(self._run_batch, batch)
+
+    def _run_batch(self, batch: List[Tuple[T, Future]]):
+        try:
+            # Drop items whose caller went away, e.g. a cancelled `acall`, and
+            # mark the rest running so they can no longer be cancelled
+            batch = [(item, fut) for item, fut in batch if fut.set_running_or_notify_cancel()]
+            if not batch:
+                return
+            start = time.perf_counter()
+            try:
+                results = self.fn([item for item, _ in batch])
+                if len(results) != len(batch):
+                    raise ValueError(f"Expected {len(batch)} results, got {len(results)}")
+            except BaseException as e:
+                for _, fut in batch:
+                    fut.set_exception(e)
+                return
+            elapsed = time.perf_counter() - start
+            for (_, fut), result in zip(batch, results):
+                fut.set_result(result)
+            with self._stats_lock:
+                self._batches += 1
+                self._items += len(batch)
+                self._busy_seconds += elapsed
+        finally:
+            self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return throughput metrics since the batcher was created."""
+        with self._stats_lock:
+            batches, items, busy = self._batches, self._items, self._busy_seconds
+        uptime = time.monotonic() - self._started
+        return {
+            "batches": batches,
+            "items": items,
+            "mean_batch_size": items / batches if batches else 0.0,
+            "mean_batch_seconds": busy / batches if batches else 0.0,
+            "items_per_second": items / uptime if uptime else 0.0,
+            "items_per_busy_second": items / busy if busy else 0.0,
+            "queued": self._queue.qsize(),
+        }
@@ -4,3 +4,5 @@ PATCH_PATH = "user/{user_id}/core"
 INSERT_PATH = "user/{user_id}/recall/{event_id}"
 TIMESTAMP_KEY = "timestamp"
 TYPE_KEY = "type"
+RESPONSE_STREAM_TAG = "response_stream"
+REF_KEY = "$ref"
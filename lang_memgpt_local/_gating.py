@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import logging
+import re
+import threading
+from collections import Counter
+from typing import Callable, Dict, NamedTuple, Optional
+
+from lang_memgpt_local import _settings as settings
+from lang_memgpt_local import _utils as utils
+
+logger = logging.getLogger("memory")
+
+SMALL_TALK = frozenset({
+    "hi", "hello", "hey", "yo", "hiya", "thanks", "thank", "thx", "ty", "you", "cool", "great", "nice",
+    "bye", "goodbye", "good", "morning", "evening", "night", "lol", "haha", "wow", "awesome", "see", "ya",
+    "later",
+})
+# Answers to questions like "Want me to remember that?", so the agent must still see them
+REPLIES = frozenset({
+    "yes", "yeah", "yep", "yup", "sure", "ok", "okay", "k", "alright", "perfect", "please", "no", "nope",
+    "nah", "not", "do", "don't", "it", "that",
+})
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+class GateDecision(NamedTuple):
+    retrieve: bool
+    """Whether to embed the conversation and query recall memories."""
+    use_tools: bool
+    """Whether the agent LLM should run with tools this turn."""
+    reason: str
+
+
+class RetrievalGate:
+    """Cheap local check deciding whether a turn is worth retrieval and tool calls.
+
+    Small talk made only of greetings and thanks skips both. Yes/no replies
+    and other short statements skip recall retrieval but keep the tools, so a
+    confirmation to remember something or a bare name can still be saved. An
+    optional classifier, given as a dotted path to a callable returning the
+    probability that retrieval helps, can veto retrieval for the remaining
+    turns.
+    """
+
+    def __init__(self, min_words: int = 3, classifier: Optional[str] = None, threshold: float = 0.5):
+        self.min_words = min_words
+        self.classifier: Optional[Callable[[str], float]] = utils.import_class(classifier) if classifier else None
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._decisions: Counter = Counter()
+
+    def _decide(self, text: str) -> GateDecision:
+        words = _WORD_RE.findall(text.lower())
+        if not words:
+            return GateDecision(False, False, "empty")
+        if all(word in SMALL_TALK for word in words):
+            return GateDecision(False, False, "small_talk")
+        if all(word in SMALL_TALK or word in REPLIES for word in words):
+            return GateDecision(False, True, "reply")
+        if len(words) < self.min_words and "?" not in text:
+            return GateDecision(False, True, "short")
+        if self.classifier is not None and self.classifier(text) < self.threshold:
+            return GateDecision(False, True, "classifier")
+        return GateDecision(True, True, "retrieve")
+
+    def __call__(self, text: str) -> GateDecision:
+        decision = self._decide(text)
+        with self._lock:
+            self._decisions[decision.reason] += 1
+        logger.debug(f"Retrieval gate: {decision.reason}")
+        return decision
+
+    def stats(self) -> Dict[str, int]:
+        """Return how many turns each gating decision was taken for."""
+        with self._lock:
+            return dict(self._decisions)
+
+
+RETRIEVAL_GATE = RetrievalGate(
+    min_words=settings.SETTINGS.retrieval_gate_min_words,
+    classifier=settings.SETTINGS.retrieval_gate_classifier,
+    threshold=settings.SETTINGS.retrieval_gate_threshold,
+)
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Tuple
+
+from lang_memgpt_local import _constants as constants
+from lang_memgpt_local._schemas import MemoryRef
+
+logger = logging.getLogger("memory")
+
+
+def is_ref(value: Any) -> bool:
+    return isinstance(value, dict) and constants.REF_KEY in value
+
+
+def _version(payload: Any) -> str:
+    return hashlib.blake2b(json.dumps(payload, sort_keys=True).encode(), digest_size=8).hexdigest()
+
+
+class MemoryCache:
+    """Shared cache resolving memory references stored in the graph state.
+
+    Core memories are cached by path and content version, recall memories by
+    ID since they never change once saved. Entries missing from the cache
+    (evicted, or after a restart) are reloaded from the database.
+
+    Args:
+        load_core: Function returning `(path, memories)` for a user ID.
+        load_recall: Function returning `{id: memory}` for a list of recall memory IDs.
+        max_entries: Maximum number of cached entries.
+    """
+
+    def __init__(
+        self,
+        load_core: Callable[[str], Tuple[str, Dict[str, str]]],
+        load_recall: Callable[[List[str]], Dict[str, str]],
+        max_entries: int = 50000,
+    ):
+        self.load_core = load_core
+        self.load_recall = load_recall
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Tuple[str, ...], Any] = OrderedDict()
+
+    def _get(self, key: Tuple[str, ...]) -> Any:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def _put(self, key: Tuple[str, ...], value: Any):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def core_ref(self, user_id: str, path: str, memories: Dict[str, str]) -> MemoryRef:
+        version = _version(memories)
+        self._put(("core", path, version), memories)
+        return {constants.REF_KEY: "core", "user_id": user_id, "ids": [path], "version": version}
+
+    def recall_ref(self, user_id: str, results: List[Dict[str, Any]]) -> MemoryRef:
+        ids = []
+        for metadata in results:
+            memory_id = metadata[constants.PATH_KEY].rsplit("/", 1)[-1]
+            self._put(("recall", memory_id), metadata[constants.PAYLOAD_KEY])
+            ids.append(memory_id)
+        return {constants.REF_KEY: "recall", "user_id": user_id, "ids": ids, "version": _version(ids)}
+
+    def resolve_core(self, value: Dict[str, str] | MemoryRef) -> Dict[str, str]:
+        if not is_ref(value):
+            return value
+        memories = self._get(("core", value["ids"][0], value["version"]))
+        if memories is None:
+            path, memories = self.load_core(value["user_id"])
+            version = _version(memories)
+            if version != value["version"]:
+                logger.warning(f"Core memories at {path} changed since they were loaded, using the latest")
+            self._put(("core", path, version), memories)
+        return memories
+
+    def resolve_recall(self, value: List[str] | MemoryRef) -> List[str]:
+        if not is_ref(value):
+            return value
+        found = {memory_id: self._get(("recall", memory_id)) for memory_id in value["ids"]}
+        missing = [memory_id for memory_id, memory in found.items() if memory is None]
+        if missing:
+            loaded = self.load_recall(missing)
+            for memory_id in missing:
+                if loaded.get(memory_id) is not None:
+                    self._put(("recall", memory_id), loaded[memory_id])
+                    found[memory_id] = loaded[memory_id]
+        return [found[memory_id] for memory_id in value["ids"] if found[memory_id] is not None]
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import List, Optional
+from typing import Dict, List, Optional, Union
 
 from langchain_core.messages import AnyMessage
 from langgraph.graph import add_messages
@@ -16,19 +16,36 @@ class GraphConfig(TypedDict):
     """The ID of the user to remember in the conversation."""
 
 
+class MemoryRef(TypedDict, total=False):
+    """Compact reference to memories kept in the shared memory cache.
+
+    The memory kind ("core" or "recall") is stored under the "$ref" key.
+    """
+
+    user_id: str
+    """The ID of the user the memories belong to."""
+    ids: List[str]
+    """The core memory path, or the recall memory IDs in retrieval order."""
+    version: str
+    """Hash of the referenced content, to detect stale references."""
+
+
 # Define the schema for the state maintained throughout the conversation
 class State(TypedDict):
     messages: Annotated[List[AnyMessage], add_messages]
     """The messages in the conversation."""
-    core_memories: List[str]
-    """The core memories associated with the user."""
-    recall_memories: List[str]
-    """The recall memories retrieved for the current context."""
+    core_memories: Union[Dict[str, str], MemoryRef]
+    """The core memories associated with the user, or a reference to them."""
+    recall_memories: Union[List[str], MemoryRef]
+    """The recall memories retrieved for the current context, or a reference to them."""
     final_response: Optional[str]
     """response to final llm"""
+    use_tools: Optional[bool]
+    """Whether the agent LLM runs with tools for the current turn."""
 
 
 __all__ = [
+    "MemoryRef",
     "State",
     "GraphConfig",
 ]
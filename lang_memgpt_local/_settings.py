@@ -1,9 +1,25 @@
 from pydantic_settings import BaseSettings
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+from typing_extensions import Literal
 
 class Settings(BaseSettings):
     vectordb_class: str = "lang_memgpt_local.adapters.chroma.ChromaAdapter"
     vectordb_config: Dict[str, Any] = {"persist_directory": "./vectordb"}
+    vectordb_batch_max_size: int = 32
+    vectordb_batch_max_wait_ms: float = 2.0
+    vectordb_batch_workers: int = 2
+    embeddings_class: str = "langchain_openai.OpenAIEmbeddings"
+    embeddings_config: Dict[str, Any] = {"model": "text-embedding-3-small"}
+    wisdom_embeddings_class: str = "langchain_openai.OpenAIEmbeddings"
+    wisdom_embeddings_config: Dict[str, Any] = {}
     model: str = "gpt-4o-mini"
+    memory_state_mode: Literal["inline", "reference"] = "inline"
+    memory_cache_max_entries: int = 50000
+    recall_drift_threshold: float = 0.05  # cosine distance; negative re-queries every turn
+    recall_snapshot_max_threads: int = 10000
+    retrieval_gate_enabled: bool = True
+    retrieval_gate_min_words: int = 3
+    retrieval_gate_classifier: Optional[str] = None  # dotted path to a `(text) -> probability` callable
+    retrieval_gate_threshold: float = 0.5
 
 SETTINGS = Settings()
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, List
+
+from langchain_core.embeddings import Embeddings
+
+
+class _LeaderAborted(Exception):
+    """Raised to followers when the leader call was cancelled rather than failed."""
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one in-flight call.
+
+    The first caller for a key runs the function, callers arriving while it is
+    in flight wait for and share its result. Sync and async callers share the
+    same table, so a thread calling `do` and a coroutine calling `ado` with the
+    same key are coalesced as well. A sync follower must not block the event
+    loop an async leader is running on. If the leader is cancelled, a waiting
+    follower takes over and runs the call again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+
+    def _join(self, key: Hashable) -> tuple[Future, bool]:
+        with self._lock:
+            fut = self._calls.get(key)
+            if fut is not None:
+                return fut, False
+            fut = self._calls[key] = Future()
+            return fut, True
+
+    def _finish(self, key: Hashable, fut: Future, result: Any = None, error: BaseException | None = None):
+        with self._lock:
+            self._calls.pop(key, None)
+        if error is None:
+            fut.set_result(result)
+        elif isinstance(error, Exception):
+            fut.set_exception(error)
+        else:
+            # The leader was cancelled or interrupted, let a follower retry instead of failing it
+            fut.set_exception(_LeaderAborted())
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args: Any) -> Any:
+        while True:
+            fut, leader = self._join(key)
+            if leader:
+                break
+            try:
+                return fut.result()
+            except _LeaderAborted:
+                continue
+        try:
+            result = fn(*args)
+        except BaseException as e:
+            self._finish(key, fut, error=e)
+            raise
+        self._finish(key, fut, result)
+        return result
+
+    async def ado(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args: Any) -> Any:
+        while True:
+            fut, leader = self._join(key)
+            if leader:
+                break
+            try:
+                # Shielded so a cancelled follower doesn't cancel the shared future
+                return await asyncio.shield(asyncio.wrap_future(fut))
+            except _LeaderAborted:
+                continue
+        try:
+            result = await fn(*args)
+        except BaseException as e:
+            self._finish(key, fut, error=e)
+            raise
+        self._finish(key, fut, result)
+        return result
+
+
+class SingleFlightEmbeddings(Embeddings):
+    """Embeddings wrapper sharing one request between concurrent identical queries."""
+
+    def __init__(self, embeddings: Embeddings):
+        self.embeddings = embeddings
+        self._flight = SingleFlight()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._flight.do(text, self.embeddings.embed_query, text)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self._flight.ado(text, self.embeddings.aembed_query, text)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.embeddings.aembed_documents(texts)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the wrapped provider's metrics, empty if it has none."""
+        stats = getattr(self.embeddings, "stats", None)
+        return stats() if stats is not None else {}
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import math
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from lang_memgpt_local import _settings as settings
+
+
+class RecallSnapshot(NamedTuple):
+    user_id: str
+    vector: List[float]
+    results: List[Dict[str, Any]]
+    version: int
+
+
+def cosine_similarity(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class RecallSnapshots:
+    """Per-thread cache of the last recall retrieval.
+
+    A snapshot is reused while the conversation embedding stays within
+    `drift_threshold` cosine distance of the one it was retrieved for and no
+    recall memory was written for the user since.
+    """
+
+    def __init__(self, drift_threshold: float, max_threads: int):
+        self.drift_threshold = drift_threshold
+        self.max_threads = max_threads
+        self._lock = threading.Lock()
+        self._snapshots: OrderedDict[str, RecallSnapshot] = OrderedDict()
+        self._versions: Dict[str, int] = {}
+
+    def version(self, user_id: str) -> int:
+        return self._versions.get(user_id, 0)
+
+    def invalidate_user(self, user_id: str):
+        """Mark every snapshot of the user stale after a memory write."""
+        with self._lock:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+
+    def get(self, thread_id: str, user_id: str, vector: List[float]) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            snapshot = self._snapshots.get(thread_id)
+            if snapshot is None or snapshot.user_id != user_id or snapshot.version != self.version(user_id):
+                return None
+            self._snapshots.move_to_end(thread_id)
+        if 1.0 - cosine_similarity(snapshot.vector, vector) > self.drift_threshold:
+            return None
+        return snapshot.results
+
+    def put(self, thread_id: str, user_id: str, vector: List[float], results: List[Dict[str, Any]], version: int):
+        with self._lock:
+            self._snapshots[thread_id] = RecallSnapshot(user_id, vector, results, version)
+            self._snapshots.move_to_end(thread_id)
+            while len(self._snapshots) > self.max_threads:
+                self._snapshots.popitem(last=False)
+
+
+RECALL_SNAPSHOTS = RecallSnapshots(
+    drift_threshold=settings.SETTINGS.recall_drift_threshold,
+    max_threads=settings.SETTINGS.recall_snapshot_max_threads,
+)
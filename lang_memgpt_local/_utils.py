@@ -6,20 +6,25 @@ from dotenv import load_dotenv
 from functools import lru_cache
 import langsmith
 from langchain_core.runnables import RunnableConfig
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from langchain_openai import ChatOpenAI
 from importlib import import_module
 from lang_memgpt_local import _schemas as schemas
 from lang_memgpt_local import _settings as settings
+from lang_memgpt_local._singleflight import SingleFlightEmbeddings
 
 _DEFAULT_DELAY = 20  # seconds
 
 load_dotenv()
 
+def import_class(path: str):
+    module_name, class_name = path.rsplit('.', 1)
+    module = import_module(module_name)
+    return getattr(module, class_name)
+
+
 @lru_cache
 def get_vectordb_client():
-    module_name, class_name = settings.SETTINGS.vectordb_class.rsplit('.', 1)
-    module = import_module(module_name)
-    VectorDBClass = getattr(module, class_name)
+    VectorDBClass = import_class(settings.SETTINGS.vectordb_class)
     return VectorDBClass(**settings.SETTINGS.vectordb_config)
 
 # Other utility functions...
@@ -40,9 +45,15 @@ def ensure_configurable(config: RunnableConfig) -> schemas.GraphConfig:
 
 @lru_cache
 def get_embeddings():
-    return OpenAIEmbeddings(
-        model="text-embedding-3-small"
-    )
+    EmbeddingsClass = import_class(settings.SETTINGS.embeddings_class)
+    return SingleFlightEmbeddings(EmbeddingsClass(**settings.SETTINGS.embeddings_config))
+
+
+@lru_cache
+def get_wisdom_embeddings():
+    """Embeddings matching the ask_wisdom knowledge base index."""
+    EmbeddingsClass = import_class(settings.SETTINGS.wisdom_embeddings_class)
+    return SingleFlightEmbeddings(EmbeddingsClass(**settings.SETTINGS.wisdom_embeddings_config))
 
 
 def init_agent_model(model_name: str = None):
@@ -2,6 +2,9 @@ from abc import ABC, abstractmethod
 from typing import List, Dict, Any
 
 class VectorDBInterface(ABC):
+    multiprocess_safe: bool = False
+    """Whether several processes can use the same store at once, e.g. a client/server database."""
+
     @abstractmethod
     def get_or_create_collection(self, name: str):
         pass
@@ -14,6 +17,10 @@ class VectorDBInterface(ABC):
     def query_memories(self, vector: List[float], where: Dict[str, Any], n_results: int) -> List[Dict[str, Any]]:
         pass
 
+    def query_memories_batch(self, vectors: List[List[float]], wheres: List[Dict[str, Any]],
+                             n_results: List[int]) -> List[List[Dict[str, Any]]]:
+        return [self.query_memories(v, w, n) for v, w, n in zip(vectors, wheres, n_results)]
+
     @abstractmethod
     def get_collection(self, name: str):
         pass
@@ -1,7 +1,25 @@
+import json
+
 import chromadb
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 from .base import VectorDBInterface
 
+
+def _split_user_filter(where: Dict[str, Any]) -> Tuple[Optional[str], List[Dict[str, Any]]]:
+    """Split a where filter into the user ID it is scoped to and its remaining clauses."""
+    clauses = where["$and"] if list(where) == ["$and"] else [where] if where else []
+    user_id, rest = None, []
+    for clause in clauses:
+        condition = clause.get("user_id") if len(clause) == 1 else None
+        if isinstance(condition, dict) and list(condition) == ["$eq"]:
+            condition = condition["$eq"]
+        if user_id is None and isinstance(condition, str):
+            user_id = condition
+        else:
+            rest.append(clause)
+    return user_id, rest
+
+
 class ChromaAdapter(VectorDBInterface):
     def __init__(self, persist_directory: str):
         self.client = chromadb.PersistentClient(path=persist_directory)
@@ -21,9 +39,53 @@ class ChromaAdapter(VectorDBInterface):
         results = collection.query(query_embeddings=[vector], where=where, n_results=n_results)
         return results['metadatas'][0] if results['metadatas'] else []
 
+    def query_memories_batch(self, vectors: List[List[float]], wheres: List[Dict[str, Any]],
+                             n_results: List[int]) -> List[List[Dict[str, Any]]]:
+        collection = self.get_or_create_collection("memories")
+        # Chroma applies one where filter per query call, so queries that differ only in their
+        # user are merged into one call filtering on all their users, and split up afterwards
+        scoped = [_split_user_filter(where) for where in wheres]
+        groups: Dict[str, List[int]] = {}
+        for i, (user_id, rest) in enumerate(scoped):
+            key = json.dumps(rest, sort_keys=True) if user_id is not None else json.dumps(wheres[i], sort_keys=True)
+            groups.setdefault(f"{user_id is not None}:{key}", []).append(i)
+
+        output: List[List[Dict[str, Any]]] = [[] for _ in vectors]
+        for idxs in groups.values():
+            user_id, rest = scoped[idxs[0]]
+            if user_id is None:
+                where, n_total = wheres[idxs[0]], max(n_results[i] for i in idxs)
+            else:
+                clauses = rest + [{"user_id": {"$in": sorted({scoped[i][0] for i in idxs})}}]
+                where = clauses[0] if len(clauses) == 1 else {"$and": clauses}
+                n_total = sum(n_results[i] for i in idxs)
+            results = collection.query(
+                query_embeddings=[vectors[i] for i in idxs],
+                where=where,
+                n_results=n_total,
+            )
+            for i, shared in zip(idxs, results['metadatas'] or []):
+                metadatas, user_id = shared, scoped[i][0]
+                if user_id is not None:
+                    metadatas = [m for m in shared if m.get("user_id") == user_id]
+                    if len(metadatas) < n_results[i] and len(shared) == n_total:
+                        # Other users' memories crowded this caller out of the shared results
+                        metadatas = self.query_memories(vectors[i], wheres[i], n_results[i])
+                output[i] = metadatas[:n_results[i]]
+        return output
+
     def get_collection(self, name: str):
         return self.get_or_create_collection(name)
 
     def upsert(self, collection_name: str, ids: List[str], metadatas: List[Dict[str, Any]], documents: List[str]):
         collection = self.get_or_create_collection(collection_name)
-        collection.upsert(ids=ids, metadatas=metadatas, documents=documents)
\ No newline at end of file
+        collection.upsert(ids=ids, metadatas=metadatas, documents=documents)
+
+class ChromaHttpAdapter(ChromaAdapter):
+    """Adapter for a Chroma server, safe to share between worker processes."""
+
+    multiprocess_safe = True
+
+    def __init__(self, host: str = "localhost", port: int = 8000):
+        self.client = chromadb.HttpClient(host=host, port=port)
+        self.collections = {}
@@ -1,40 +1,118 @@
+import asyncio
 import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
 
-from lang_memgpt_local.graph import memgraph
+from lang_memgpt_local import _constants as constants
+from langchain_core.callbacks import AsyncCallbackHandler
 from langchain_core.messages import HumanMessage
+from langgraph.graph.graph import CompiledGraph
+from typing_extensions import Literal
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 logging.getLogger('langsmith.client').setLevel(logging.ERROR)
 
+_STREAM_END = object()
+
+
+class _TokenStreamHandler(AsyncCallbackHandler):
+    """Callback channel forwarding only response LLM tokens to a queue.
+
+    Every other callback is a no-op, so unlike `astream_events` no event dict
+    is built for chain starts/ends or agent LLM tokens. Final tool outputs are
+    collected in `tool_outputs` as (tool name, output) pairs.
+    """
+
+    run_inline = True
+
+    def __init__(self, tool_outputs: List[Tuple[str, Any]]):
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.tool_names: Dict[UUID, str] = {}
+        self.tool_outputs = tool_outputs
+
+    async def on_llm_new_token(self, token: str, *, tags: Optional[list] = None, **kwargs: Any) -> None:
+        if tags and constants.RESPONSE_STREAM_TAG in tags:
+            self.queue.put_nowait((token, time.perf_counter()))
+
+    async def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID,
+                            **kwargs: Any) -> None:
+        self.tool_names[run_id] = (serialized or {}).get("name") or kwargs.get("name", "tool")
+        logger.debug(f"Tool started: {self.tool_names[run_id]}")
+
+    async def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        name = self.tool_names.pop(run_id, "tool")
+        self.tool_outputs.append((name, output))
+        logger.debug(f"Tool ended: {name}")
+        logger.debug(f"Tool output: {output}")
+
 
 class Chat:
-    def __init__(self, user_id: str, thread_id: str):
+    def __init__(self, user_id: str, thread_id: str, stream_mode: Literal["tokens", "events"] = "tokens",
+                 graph: Optional[CompiledGraph] = None):
+        if graph is None:
+            from lang_memgpt_local.graph import memgraph as graph
         self.thread_id = thread_id
         self.user_id = user_id
+        self.stream_mode = stream_mode
+        self.graph = graph
+        # (tool name, output) pairs of the tools run during the last response
+        self.tool_outputs: List[Tuple[str, Any]] = []
+
+    def _config(self) -> dict:
+        return {"configurable": {"user_id": self.user_id, "thread_id": self.thread_id}}
 
     async def stream_response(self, query: str):
         logger.debug(f"Chat called with query: {query}")
         logger.debug(f"User ID: {self.user_id}, Thread ID: {self.thread_id}")
 
-        config = {"configurable": {"user_id": self.user_id, "thread_id": self.thread_id}}
-        input_message = HumanMessage(content=query)
-        chunks = memgraph.astream_events(
-            input={"messages": [input_message]},
-            config=config,
+        self.tool_outputs = []
+        stream = self._stream_tokens if self.stream_mode == "tokens" else self._stream_events
+        async for tok in stream(query):
+            yield tok  # Yield the token as it's received
+
+    async def _stream_tokens(self, query: str):
+        """Stream response LLM tokens through a dedicated callback channel."""
+        handler = _TokenStreamHandler(self.tool_outputs)
+        config = {**self._config(), "callbacks": [handler]}
+        task = asyncio.create_task(self.graph.ainvoke({"messages": [HumanMessage(content=query)]}, config=config))
+        task.add_done_callback(lambda _: handler.queue.put_nowait(_STREAM_END))
+
+        n_tokens, delivery = 0, 0.0
+        try:
+            while (item := await handler.queue.get()) is not _STREAM_END:
+                tok, produced_at = item
+                n_tokens += 1
+                delivery += time.perf_counter() - produced_at
+                yield tok
+            await task  # Surface graph errors to the caller
+        finally:
+            if not task.done():
+                task.cancel()
+            if n_tokens:
+                logger.debug(f"Streamed {n_tokens} tokens, mean delivery overhead "
+                             f"{delivery / n_tokens * 1e6:.1f}us/token")
+
+    async def _stream_events(self, query: str):
+        """Stream response LLM tokens by filtering the full `astream_events` feed."""
+        chunks = self.graph.astream_events(
+            input={"messages": [HumanMessage(content=query)]},
+            config=self._config(),
             version="v2",
         )
 
         async for event in chunks:
             if event.get("event") == "on_chat_model_stream":
                 if event.get('metadata', {}).get('langgraph_node', {}) == 'response_llm':
-                    tok = event["data"]["chunk"].content
-                    yield tok  # Yield the token as it's received
+                    yield event["data"]["chunk"].content
             elif event.get("event") == "on_tool_start":
                 logger.debug(f"Tool started: {event.get('name')}")
             elif event.get("event") == "on_tool_end":
+                output = event.get('data', {}).get('output')
+                self.tool_outputs.append((event.get('name'), output))
                 logger.debug(f"Tool ended: {event.get('name')}")
-                logger.debug(f"Tool output: {event.get('data', {}).get('output')}")
+                logger.debug(f"Tool output: {output}")
 
     async def __call__(self, query: str) -> str:
         res = []
@@ -0,0 +1,354 @@
+"""User-affinity multi-process dispatcher.
+
+Routes every user to a fixed worker process by consistent hashing, so each
+process keeps the caches, recall snapshots and checkpoints of its users hot.
+When workers are added or removed, only the users whose owner changes are
+moved, and their thread checkpoints are copied to the new owner first.
+
+All workers share one vector store, so the pool requires an adapter that is
+safe to use from several processes, such as `ChromaHttpAdapter` talking to
+a Chroma server. The local `ChromaAdapter` keeps a per-process index and is
+rejected.
+"""
+
+import asyncio
+import bisect
+import hashlib
+import itertools
+import logging
+import multiprocessing as mp
+import queue
+import threading
+from collections import Counter, OrderedDict, defaultdict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
+
+from lang_memgpt_local import _settings as settings
+from lang_memgpt_local import _utils as utils
+
+logger = logging.getLogger(__name__)
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent hash ring with virtual nodes."""
+
+    def __init__(self, nodes: Iterable[str] = (), replicas: int = 100):
+        self.replicas = replicas
+        self.nodes: Set[str] = set()
+        self._keys: List[int] = []
+        self._owners: Dict[int, str] = {}
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node: str):
+        self.nodes.add(node)
+        for i in range(self.replicas):
+            h = _hash(f"{node}#{i}")
+            self._owners[h] = node
+            bisect.insort(self._keys, h)
+
+    def remove(self, node: str):
+        self.nodes.discard(node)
+        for i in range(self.replicas):
+            h = _hash(f"{node}#{i}")
+            del self._owners[h]
+            self._keys.remove(h)
+
+    def copy(self) -> "HashRing":
+        return HashRing(self.nodes, self.replicas)
+
+    def get(self, key: str) -> str:
+        if not self._keys:
+            raise LookupError("No workers in the hash ring")
+        idx = bisect.bisect(self._keys, _hash(key)) % len(self._keys)
+        return self._owners[self._keys[idx]]
+
+
+def _worker_main(inbox: mp.Queue, outbox: mp.Queue):
+    asyncio.run(_serve(inbox, outbox))
+
+
+async def _serve(inbox: mp.Queue, outbox: mp.Queue):
+    # Imported here so the dispatcher process never loads the graph
+    from lang_memgpt_local import _snapshots as snapshots
+    from lang_memgpt_local.chat import Chat
+    from lang_memgpt_local.graph import memgraph
+
+    async def handle(op: str, req_id: int, payload: Any):
+        try:
+            result = None
+            if op == "chat":
+                user_id, thread_id, query = payload
+                async for tok in Chat(user_id, thread_id).stream_response(query):
+                    outbox.put(("token", req_id, tok))
+            elif op == "export":
+                result = {}
+                for thread_id in payload:
+                    snapshot = await memgraph.aget_state({"configurable": {"thread_id": thread_id}})
+                    if snapshot.values:
+                        result[thread_id] = snapshot.values
+            elif op == "import":
+                states, user_ids = payload
+                # Snapshots left from an earlier stay on this worker missed writes made elsewhere
+                for user_id in user_ids:
+                    snapshots.RECALL_SNAPSHOTS.invalidate_user(user_id)
+                for thread_id, values in states.items():
+                    await memgraph.aupdate_state(
+                        {"configurable": {"thread_id": thread_id}}, values, as_node="response_llm"
+                    )
+            outbox.put(("done", req_id, result))
+        except Exception as e:
+            logger.exception(f"Worker failed on {op}")
+            outbox.put(("error", req_id, f"{type(e).__name__}: {e}"))
+
+    loop = asyncio.get_running_loop()
+    tasks = set()
+    while True:
+        op, req_id, payload = await loop.run_in_executor(None, inbox.get)
+        if op == "stop":
+            break
+        task = asyncio.create_task(handle(op, req_id, payload))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+class _Worker:
+    def __init__(self, name: str, ctx, pool: "WorkerPool"):
+        self.name = name
+        self.stopping = False
+        self.inbox = ctx.Queue()
+        self.outbox = ctx.Queue()
+        self.process = ctx.Process(target=_worker_main, args=(self.inbox, self.outbox), name=name, daemon=True)
+        self.process.start()
+        self._reader = threading.Thread(target=self._read, args=(pool, asyncio.get_running_loop()), daemon=True)
+        self._reader.start()
+
+    def stop(self):
+        self.stopping = True
+        self.inbox.put(("stop", None, None))
+
+    def _read(self, pool: "WorkerPool", loop: asyncio.AbstractEventLoop):
+        while True:
+            try:
+                msg = self.outbox.get(timeout=1.0)
+            except queue.Empty:
+                if not self.process.is_alive():
+                    if not self.stopping:
+                        loop.call_soon_threadsafe(pool._fail_worker, self.name)
+                    return
+                continue
+            loop.call_soon_threadsafe(pool._deliver, msg)
+
+
+class WorkerPool:
+    """Dispatch chat turns to worker processes with user affinity.
+
+    Args:
+        num_workers: Number of worker processes to start, defaults to the CPU count.
+        replicas: Virtual nodes per worker on the hash ring.
+        max_tracked_threads: Number of most recently used threads whose checkpoints
+            are moved on rebalancing. Older threads start fresh on their new worker.
+
+    Raises:
+        ValueError: If the configured vector DB adapter is not safe to share between processes.
+
+    Example:
+        ```python
+        async with WorkerPool(4) as pool:
+            async for tok in pool.stream_response(user_id, thread_id, "Hi!"):
+                print(tok, end="")
+        ```
+    """
+
+    def __init__(self, num_workers: Optional[int] = None, replicas: int = 100, max_tracked_threads: int = 100000):
+        VectorDBClass = utils.import_class(settings.SETTINGS.vectordb_class)
+        if not VectorDBClass.multiprocess_safe:
+            raise ValueError(
+                f"{settings.SETTINGS.vectordb_class} can't be shared between worker processes, "
+                "use a client/server adapter such as lang_memgpt_local.adapters.chroma.ChromaHttpAdapter"
+            )
+        self.num_workers = num_workers or mp.cpu_count()
+        self.max_tracked_threads = max_tracked_threads
+        self._ctx = mp.get_context("spawn")
+        self._ring = HashRing(replicas=replicas)
+        self._workers: Dict[str, _Worker] = {}
+        self._names = itertools.count()
+        self._ids = itertools.count()
+        self._pending: Dict[int, Tuple[str, asyncio.Queue]] = {}
+        self._threads: OrderedDict[str, str] = OrderedDict()  # thread_id -> user_id, least recent first
+        self._active: Counter = Counter()
+        self._next_ring: Optional[HashRing] = None  # Ring being switched to while rebalancing
+        self._cond = asyncio.Condition()
+        self._rebalance_lock = asyncio.Lock()
+
+    async def __aenter__(self) -> "WorkerPool":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def start(self):
+        for _ in range(self.num_workers):
+            worker = self._spawn()
+            self._ring.add(worker.name)
+
+    async def close(self):
+        for worker in self._workers.values():
+            worker.stop()
+        for worker in self._workers.values():
+            await asyncio.to_thread(worker.process.join, 10)
+        self._workers.clear()
+
+    def owner(self, user_id: str) -> str:
+        """Return the name of the worker serving the user."""
+        return self._ring.get(user_id)
+
+    async def stream_response(self, user_id: str, thread_id: str, query: str) -> AsyncIterator[str]:
+        async with self._route(user_id, thread_id) as worker:
+            async for kind, data in self._stream(worker, "chat", (user_id, thread_id, query)):
+                if kind == "token":
+                    yield data
+
+    async def chat(self, user_id: str, thread_id: str, query: str) -> str:
+        return "".join([tok async for tok in self.stream_response(user_id, thread_id, query)])
+
+    async def add_worker(self) -> str:
+        """Start a new worker and move the users it now owns to it."""
+        async with self._rebalance_lock:
+            worker = self._spawn()
+            ring = self._ring.copy()
+            ring.add(worker.name)
+            try:
+                await self._rebalance(ring)
+            except BaseException:
+                self._workers.pop(worker.name, None)
+                worker.stop()
+                raise
+            return worker.name
+
+    async def remove_worker(self, name: str):
+        """Move the users of a worker to their new owners and stop it."""
+        async with self._rebalance_lock:
+            if name not in self._workers:
+                return  # Already gone, e.g. the process died
+            ring = self._ring.copy()
+            ring.remove(name)
+            await self._rebalance(ring)
+            worker = self._workers.pop(name)
+            worker.stop()
+            await asyncio.to_thread(worker.process.join, 10)
+
+    def _spawn(self) -> _Worker:
+        worker = _Worker(f"worker-{next(self._names)}", self._ctx, self)
+        self._workers[worker.name] = worker
+        return worker
+
+    @asynccontextmanager
+    async def _route(self, user_id: str, thread_id: str):
+        async with self._cond:
+            await self._cond.wait_for(lambda: not self._is_moving(user_id))
+            self._active[user_id] += 1
+            self._threads[thread_id] = user_id
+            self._threads.move_to_end(thread_id)
+            while len(self._threads) > self.max_tracked_threads:
+                self._threads.popitem(last=False)
+            worker = self._workers[self._ring.get(user_id)]
+        try:
+            yield worker
+        finally:
+            async with self._cond:
+                self._active[user_id] -= 1
+                if not self._active[user_id]:
+                    del self._active[user_id]
+                self._cond.notify_all()
+
+    def _is_moving(self, user_id: str) -> bool:
+        return self._next_ring is not None and self._next_ring.get(user_id) != self._ring.get(user_id)
+
+    async def _rebalance(self, ring: HashRing):
+        # Hold back every user whose owner changes, including users not seen before,
+        # until the turns they already have in flight are done
+        async with self._cond:
+            self._next_ring = ring
+            await self._cond.wait_for(lambda: not any(self._is_moving(u) for u in self._active))
+        try:
+            moves: Dict[Tuple[str, str], List[str]] = defaultdict(list)
+            moved_users: Dict[Tuple[str, str], Set[str]] = defaultdict(set)
+            for thread_id, user_id in self._threads.items():
+                src, dst = self._ring.get(user_id), ring.get(user_id)
+                if src != dst:
+                    moves[(src, dst)].append(thread_id)
+                    moved_users[(src, dst)].add(user_id)
+
+            for (src, dst), thread_ids in moves.items():
+                try:
+                    states = await self._rpc(self._worker(src), "export", thread_ids)
+                    await self._rpc(self._worker(dst), "import", (states, sorted(moved_users[(src, dst)])))
+                except RuntimeError as e:
+                    # A worker died while migrating, its threads are lost as in _fail_worker
+                    logger.error(f"Could not move {len(thread_ids)} threads from {src} to {dst}: {e}")
+                    continue
+                logger.info(f"Moved {len(states)} threads from {src} to {dst}")
+            # Drop workers that died while migrating
+            for node in ring.nodes - self._workers.keys():
+                ring.remove(node)
+            self._ring = ring
+        finally:
+            async with self._cond:
+                self._next_ring = None
+                self._cond.notify_all()
+
+    def _worker(self, name: str) -> _Worker:
+        worker = self._workers.get(name)
+        if worker is None:
+            raise RuntimeError(f"{name}: worker process is not running")
+        return worker
+
+    async def _stream(self, worker: _Worker, op: str, payload: Any) -> AsyncIterator[Tuple[str, Any]]:
+        if worker.name not in self._workers or not worker.process.is_alive():
+            raise RuntimeError(f"{worker.name}: worker process is not running")
+        req_id = next(self._ids)
+        responses: asyncio.Queue = asyncio.Queue()
+        self._pending[req_id] = (worker.name, responses)
+        worker.inbox.put((op, req_id, payload))
+        try:
+            while True:
+                kind, data = await responses.get()
+                if kind == "error":
+                    raise RuntimeError(f"{worker.name}: {data}")
+                yield kind, data
+                if kind == "done":
+                    return
+        finally:
+            self._pending.pop(req_id, None)
+
+    async def _rpc(self, worker: _Worker, op: str, payload: Any) -> Any:
+        result = None
+        async for kind, data in self._stream(worker, op, payload):
+            if kind == "done":
+                result = data
+        return result
+
+    def _deliver(self, msg: Tuple[str, int, Any]):
+        kind, req_id, data = msg
+        pending = self._pending.get(req_id)
+        if pending is not None:
+            pending[1].put_nowait((kind, data))
+
+    def _fail_worker(self, name: str):
+        """Take a dead worker out of rotation, its users move to the remaining workers."""
+        logger.error(f"Worker {name} exited unexpectedly, its threads are lost")
+        self._workers.pop(name, None)
+        if name in self._ring.nodes:
+            ring = self._ring.copy()
+            ring.remove(name)
+            self._ring = ring
+        for worker_name, responses in list(self._pending.values()):
+            if worker_name == name:
+                responses.put_nowait(("error", "worker process exited"))
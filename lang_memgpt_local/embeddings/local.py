@@ -0,0 +1,60 @@
+from typing import Any, Dict, List
+
+from langchain_core.embeddings import Embeddings
+
+from lang_memgpt_local._batching import MicroBatcher
+
+
+class LocalEmbeddings(Embeddings):
+    """In-process CPU embeddings loaded from local sentence-transformers model files.
+
+    Concurrent `embed_query` calls from all sessions are micro-batched into a
+    single forward pass. Requires the `sentence-transformers` package.
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        device: str = "cpu",
+        normalize: bool = True,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        num_workers: int = 1,
+    ):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError(
+                "LocalEmbeddings requires sentence-transformers: pip install sentence-transformers"
+            ) from e
+        self.model = SentenceTransformer(model_path, device=device)
+        self.normalize = normalize
+        self.batcher = MicroBatcher(
+            self._encode,
+            max_batch_size=max_batch_size,
+            max_wait_ms=max_wait_ms,
+            max_workers=num_workers,
+            name="local-embeddings",
+        )
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        return self.model.encode(
+            texts,
+            batch_size=len(texts),
+            normalize_embeddings=self.normalize,
+            convert_to_numpy=True,
+        ).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.batcher(text)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self.batcher.acall(text)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        futures = [self.batcher.submit(text) for text in texts]
+        return [fut.result() for fut in futures]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return micro-batching throughput metrics."""
+        return self.batcher.stats()
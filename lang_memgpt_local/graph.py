@@ -1,9 +1,11 @@
 import logging
 from datetime import datetime, timezone
+from typing import Dict, List, Tuple
 
 import tiktoken
 from langchain import hub
 from dotenv import load_dotenv
+from langchain_core.messages import AnyMessage
 from langchain_core.messages.utils import get_buffer_string
 from langchain_core.runnables.config import RunnableConfig, get_executor_for_config
 from langgraph.checkpoint.memory import MemorySaver
@@ -11,9 +13,15 @@ from langgraph.graph import END, START, StateGraph
 from langgraph.prebuilt import ToolNode
 from typing_extensions import Literal
 
+from lang_memgpt_local import _constants as constants
+from lang_memgpt_local import _gating as gating
 from lang_memgpt_local import _schemas as schemas
+from lang_memgpt_local import _settings as settings
+from lang_memgpt_local import _snapshots as snapshots
 from lang_memgpt_local import _utils as utils
+from lang_memgpt_local._memory_cache import MemoryCache
 from lang_memgpt_local.tools import save_recall_memory, search_memory, store_core_memory, fetch_core_memories
+from lang_memgpt_local.tools import fetch_recall_memories_by_ids, query_recall_memories
 from lang_memgpt_local.tools import search_tool, ask_wisdom
 
 load_dotenv()
@@ -24,6 +32,13 @@ memory_tools = [save_recall_memory, store_core_memory]
 utility_tools = [search_tool, search_memory, ask_wisdom]
 all_tools = memory_tools + utility_tools
 
+# Shared cache resolving memory references when memory_state_mode is "reference"
+memory_cache = MemoryCache(
+    load_core=fetch_core_memories,
+    load_recall=fetch_recall_memories_by_ids,
+    max_entries=settings.SETTINGS.memory_cache_max_entries,
+)
+
 prompts = {
     "agent": hub.pull("langgraph-agent"),
     "response": hub.pull("langgraph-response"),
@@ -43,8 +58,9 @@ async def agent_llm(state: schemas.State, config: RunnableConfig) -> schemas.Sta
     configurable = utils.ensure_configurable(config)
     llm = utils.init_agent_model(configurable["model"])
     bound = prompts["agent"] | llm.bind_tools(all_tools, tool_choice="auto")
-    core_str = "<core_memory>\n" + "\n".join([f"{k}: {v}" for k, v in state["core_memories"].items()]) + "\n</core_memory>"
-    recall_str = "<recall_memory>\n" + "\n".join(state["recall_memories"]) + "\n</recall_memory>"
+    core_memories, recall_memories = resolve_memories(state)
+    core_str = "<core_memory>\n" + "\n".join([f"{k}: {v}" for k, v in core_memories.items()]) + "\n</core_memory>"
+    recall_str = "<recall_memory>\n" + "\n".join(recall_memories) + "\n</recall_memory>"
     logger.debug(f"Core memories: {core_str}")
     logger.debug(f"Recall memories: {recall_str}")
     response = await bound.ainvoke(
@@ -66,13 +82,14 @@ async def agent_llm(state: schemas.State, config: RunnableConfig) -> schemas.Sta
 async def response_llm(state: schemas.State, config: dict) -> schemas.State:
     """Final LLM to generate response using memories but no tools"""
     llm = utils.init_response_model()
-    bound = prompts["response"] | llm
+    bound = prompts["response"] | llm.with_config(tags=[constants.RESPONSE_STREAM_TAG])
 
     state_messages = state["messages"][:-1] if state["messages"][-1].type == 'ai' else state["messages"]
+    core_memories, recall_memories = resolve_memories(state)
     response = await bound.ainvoke({
         "messages": state_messages,
-        "core_memories": state["core_memories"],
-        "recall_memories": state["recall_memories"],
+        "core_memories": core_memories,
+        "recall_memories": recall_memories,
         "current_time": datetime.now(tz=timezone.utc).isoformat()
     })
 
@@ -84,6 +101,33 @@ async def response_llm(state: schemas.State, config: dict) -> schemas.State:
     }
 
 
+def fetch_recall_memories(user_id: str, thread_id: str, convo_str: str) -> List[dict]:
+    """Fetch recall memories for the conversation, reusing the thread snapshot when the topic hasn't drifted.
+
+    Args:
+        user_id (str): The ID of the user.
+        thread_id (str): The ID of the conversation thread.
+        convo_str (str): The conversation to retrieve memories for.
+
+    Returns:
+        List[dict]: The metadata of the relevant recall memories.
+    """
+    try:
+        vector = utils.get_embeddings().embed_query(convo_str)
+        results = snapshots.RECALL_SNAPSHOTS.get(thread_id, user_id, vector)
+        if results is None:
+            # Read the version before querying so a concurrent write invalidates this snapshot
+            version = snapshots.RECALL_SNAPSHOTS.version(user_id)
+            results = query_recall_memories(user_id, vector)
+            snapshots.RECALL_SNAPSHOTS.put(thread_id, user_id, vector, results, version)
+        else:
+            logger.debug(f"Reusing recall snapshot for thread {thread_id}")
+        return results
+    except Exception as e:
+        logger.error(f"Error in fetch_recall_memories: {str(e)}")
+        return []
+
+
 def load_memories(state: schemas.State, config: RunnableConfig) -> schemas.State:
     """Load core and recall memories for the current conversation.
 
@@ -96,25 +140,67 @@ def load_memories(state: schemas.State, config: RunnableConfig) -> schemas.State
     """
     configurable = utils.ensure_configurable(config)
     user_id = configurable["user_id"]
-    tokenizer = tiktoken.encoding_for_model("gpt-4o-mini")
-    convo_str = get_buffer_string(state["messages"])
-    convo_str = tokenizer.decode(tokenizer.encode(convo_str)[:2048])
+    decision = gating.GateDecision(True, True, "disabled")
+    if settings.SETTINGS.retrieval_gate_enabled:
+        decision = gating.RETRIEVAL_GATE(_last_human_text(state["messages"]))
 
     with get_executor_for_config(config) as executor:
-        futures = [
-            executor.submit(fetch_core_memories, user_id),
-            executor.submit(search_memory.invoke, convo_str),
-        ]
-        _, core_memories = futures[0].result()
-        recall_memories = futures[1].result()
+        core_future = executor.submit(fetch_core_memories, user_id)
+        recall_results = []
+        if decision.retrieve:
+            tokenizer = tiktoken.encoding_for_model("gpt-4o-mini")
+            convo_str = get_buffer_string(state["messages"])
+            convo_str = tokenizer.decode(tokenizer.encode(convo_str)[:2048])
+            recall_results = fetch_recall_memories(user_id, configurable["thread_id"], convo_str)
+        core_path, core_memories = core_future.result()
+
+    if settings.SETTINGS.memory_state_mode == "reference":
+        core_memories = memory_cache.core_ref(user_id, core_path, core_memories)
+        recall_memories = memory_cache.recall_ref(user_id, recall_results)
+    else:
+        recall_memories = [x[constants.PAYLOAD_KEY] for x in recall_results]
     return {
         "messages": state["messages"],
         "core_memories": core_memories,
         "recall_memories": recall_memories,
         "final_response": None,
+        "use_tools": decision.use_tools,
     }
 
 
+def resolve_memories(state: schemas.State) -> Tuple[Dict[str, str], List[str]]:
+    """Resolve the core and recall memories of the state, which may be references.
+
+    Args:
+        state (schemas.State): The current state of the conversation.
+
+    Returns:
+        Tuple[Dict[str, str], List[str]]: The core memories and recall memories.
+    """
+    return memory_cache.resolve_core(state["core_memories"]), memory_cache.resolve_recall(state["recall_memories"])
+
+
+def _last_human_text(messages: List[AnyMessage]) -> str:
+    for message in reversed(messages):
+        if message.type == "human":
+            if isinstance(message.content, str):
+                return message.content
+            # Multimodal content, keep only the text parts
+            return " ".join(
+                part if isinstance(part, str) else part.get("text", "")
+                for part in message.content
+                if isinstance(part, str) or part.get("type") == "text"
+            )
+    return ""
+
+
+def route_memories(state: schemas.State) -> Literal["agent_llm", "response_llm"]:
+    """Skip the agent LLM on turns the retrieval gate found not worth tool calls"""
+    if state.get("use_tools", True):
+        return "agent_llm"
+    return "response_llm"
+
+
 def route_tools(state: schemas.State) -> Literal["tools", "response_llm"]:
     """Route to tools or final LLM based on agent response"""
     msg = state["messages"][-1]
@@ -132,7 +218,7 @@ builder.add_node("response_llm", response_llm)
 
 # Add edges to the graph
 builder.add_edge(START, "load_memories")
-builder.add_edge("load_memories", "agent_llm")
+builder.add_conditional_edges("load_memories", route_memories, ["agent_llm", "response_llm"])
 builder.add_conditional_edges("agent_llm", route_tools, ["tools", "response_llm"])
 builder.add_edge("tools", "response_llm")
 builder.add_edge("response_llm", END)
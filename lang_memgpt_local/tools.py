@@ -9,13 +9,16 @@ import langsmith
 from dotenv import load_dotenv
 from langchain_community.tools.tavily_search import TavilySearchResults
 from langchain_core.runnables.config import ensure_config
-from langchain_core.tools import tool
-from langchain_openai import OpenAIEmbeddings
+from langchain_core.tools import StructuredTool, tool
 from langchain_qdrant import QdrantVectorStore
 from qdrant_client import QdrantClient
 
 from lang_memgpt_local import _constants as constants
+from lang_memgpt_local import _settings as settings
+from lang_memgpt_local import _snapshots as snapshots
 from lang_memgpt_local import _utils as utils
+from lang_memgpt_local._batching import MicroBatcher
+from lang_memgpt_local._singleflight import SingleFlight
 
 load_dotenv()
 logger = logging.getLogger("memory")
@@ -31,6 +34,34 @@ search_wrapper = TavilySearchResults(
 
 # Initialize the database adapter
 db_adapter = utils.get_vectordb_client()
+_query_flight = SingleFlight()
+
+
+def _query_memories_batch(queries: List[Tuple[List[float], dict, int]]) -> List[List[dict]]:
+    vectors, wheres, n_results = map(list, zip(*queries))
+    return db_adapter.query_memories_batch(vectors, wheres, n_results)
+
+
+# Collect concurrent queries from all sessions into batched database calls
+_query_batcher = MicroBatcher(
+    _query_memories_batch,
+    max_batch_size=settings.SETTINGS.vectordb_batch_max_size,
+    max_wait_ms=settings.SETTINGS.vectordb_batch_max_wait_ms,
+    max_workers=settings.SETTINGS.vectordb_batch_workers,
+    name="vectordb-query",
+)
+
+
+def query_memories(vector: List[float], where: dict, top_k: int) -> List[dict]:
+    """Query the database, sharing results between concurrent identical queries."""
+    key = (json.dumps(where, sort_keys=True), tuple(vector), top_k)
+    return _query_flight.do(key, _query_batcher, (vector, where, top_k))
+
+
+async def aquery_memories(vector: List[float], where: dict, top_k: int) -> List[dict]:
+    """Async variant of `query_memories`."""
+    key = (json.dumps(where, sort_keys=True), tuple(vector), top_k)
+    return await _query_flight.ado(key, _query_batcher.acall, (vector, where, top_k))
 
 
 @tool
@@ -64,6 +95,7 @@ async def save_recall_memory(memory: str) -> str:
     }
 
     db_adapter.add_memory(event_id, vector, metadata, memory)
+    snapshots.RECALL_SNAPSHOTS.invalidate_user(configurable["user_id"])
     return memory
 
 
@@ -99,7 +131,7 @@ def ask_wisdom(query: str) -> str:
         qdrant_vectorstore = QdrantVectorStore(
             client=QdrantClient(url=os.getenv("QDRANT_URL"), api_key=os.getenv("QDRANT_API_KEY")),
             collection_name=os.getenv("QDRANT_COLLECTION"),
-            embedding=OpenAIEmbeddings(),
+            embedding=utils.get_wisdom_embeddings(),
         )
         results = qdrant_vectorstore.similarity_search(query, k=5)
         formatted_results = "\n\n".join([doc.page_content.strip() for doc in results])
@@ -110,8 +142,21 @@ def ask_wisdom(query: str) -> str:
         return f"Error performing ask rag db: {str(e)}"
 
 
-@tool
-def search_memory(query: str, top_k: int = 5) -> List[str]:
+def _recall_where(user_id: str) -> dict:
+    return {
+        "$and": [
+            {"user_id": {"$eq": user_id}},
+            {constants.TYPE_KEY: {"$eq": "recall"}}
+        ]
+    }
+
+
+def query_recall_memories(user_id: str, vector: List[float], top_k: int = 5) -> List[dict]:
+    """Query the recall memories of a user closest to the given vector."""
+    return query_memories(vector, _recall_where(user_id), top_k)
+
+
+def _search_memory(query: str, top_k: int = 5) -> List[str]:
     """Search for memories in the database based on semantic similarity.
 
     Args:
@@ -127,14 +172,22 @@ def search_memory(query: str, top_k: int = 5) -> List[str]:
         embeddings = utils.get_embeddings()
         vector = embeddings.embed_query(query)
 
-        where_clause = {
-            "$and": [
-                {"user_id": {"$eq": configurable["user_id"]}},
-                {constants.TYPE_KEY: {"$eq": "recall"}}
-            ]
-        }
+        results = query_recall_memories(configurable["user_id"], vector, top_k)
+        return [x[constants.PAYLOAD_KEY] for x in results]
+
+    except Exception as e:
+        logger.error(f"Error in search_memory: {str(e)}")
+        return []
+
 
-        results = db_adapter.query_memories(vector, where_clause, top_k)
+async def _asearch_memory(query: str, top_k: int = 5) -> List[str]:
+    try:
+        config = ensure_config()
+        configurable = utils.ensure_configurable(config)
+        embeddings = utils.get_embeddings()
+        vector = await embeddings.aembed_query(query)
+
+        results = await aquery_memories(vector, _recall_where(configurable["user_id"]), top_k)
         return [x[constants.PAYLOAD_KEY] for x in results]
 
     except Exception as e:
@@ -142,6 +195,13 @@ def search_memory(query: str, top_k: int = 5) -> List[str]:
         return []
 
 
+search_memory = StructuredTool.from_function(
+    func=_search_memory,
+    coroutine=_asearch_memory,
+    name="search_memory",
+)
+
+
 @langsmith.traceable
 def fetch_core_memories(user_id: str) -> Tuple[str, dict[str, str]]:
     """Fetch core memories for a specific user.
@@ -163,6 +223,22 @@ def fetch_core_memories(user_id: str) -> Tuple[str, dict[str, str]]:
     return path, memories
 
 
+def fetch_recall_memories_by_ids(ids: List[str]) -> dict[str, str]:
+    """Fetch recall memories by their IDs.
+
+    Args:
+        ids (List[str]): The IDs of the recall memories.
+
+    Returns:
+        dict[str, str]: The memories found, keyed by ID.
+    """
+    collection = db_adapter.get_collection("memories")
+    results = collection.get(ids=ids, include=["metadatas"])
+    if not results or not results['metadatas']:
+        return {}
+    return {id_: metadata[constants.PAYLOAD_KEY] for id_, metadata in zip(results['ids'], results['metadatas'])}
+
+
 @tool
 def store_core_memory(key: str, value: str) -> str:
     """Store a core memory about user in key-value format.
@@ -1,4 +1,7 @@
 import asyncio
+import queue
+import threading
+import time
 import uuid
 
 import streamlit as st
@@ -17,21 +20,72 @@ USERS = {
     "horse": {"icon": "🐴", "id": "horse-user-005"}
 }
 
-# Initialize session state for all chat histories if they don't exist
-if "chat_history" not in st.session_state:
-    st.session_state.chat_history = []
+# Minimum time between re-renders of a streaming response
+RENDER_INTERVAL = 0.05  # seconds
+
+
+@st.cache_resource
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Start one long-lived event loop shared by all sessions of this server."""
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="chat-event-loop", daemon=True).start()
+    return loop
+
+
+@st.cache_resource
+def warm_up_resources():
+    """Create the shared vector DB and embeddings clients once per server."""
+    from lang_memgpt_local import _utils as utils
+    utils.get_vectordb_client()
+    utils.get_embeddings()
+
+
+def stream_response(chat: Chat, prompt: str, placeholder) -> str:
+    """Stream a response on the shared loop, rendering batched tokens on a time budget."""
+    tokens: queue.SimpleQueue = queue.SimpleQueue()
+
+    async def produce():
+        try:
+            async for token in chat.stream_response(prompt):
+                tokens.put(token)
+        finally:
+            tokens.put(None)
+
+    future = asyncio.run_coroutine_threadsafe(produce(), get_event_loop())
+    parts = []
+    try:
+        finished = False
+        while not finished:
+            deadline = time.monotonic() + RENDER_INTERVAL
+            received = False
+            while (remaining := deadline - time.monotonic()) > 0:
+                try:
+                    token = tokens.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if token is None:
+                    finished = True
+                    break
+                parts.append(token)
+                received = True
+            if received and not finished:
+                placeholder.markdown("".join(parts) + "▌")
+        future.result()  # Surface errors from the graph
+    finally:
+        future.cancel()
+    response_text = "".join(parts)
+    placeholder.markdown(response_text)
+    return response_text
+
+
+warm_up_resources()
+
+# Initialize per-user chat histories, threads and chat instances once per session
+if "chat_histories" not in st.session_state:
+    st.session_state.chat_histories = {user: [] for user in USERS.keys()}
 
-# Track the previously selected user
-if "previous_user" not in st.session_state:
-    st.session_state.previous_user = None
-
-# Initialize session state for thread IDs if they don't exist
-if "thread_ids" not in st.session_state:
-    st.session_state.thread_ids = {user: str(uuid.uuid4()) for user in USERS.keys()}
-
-# Initialize chat instances if they don't exist
 if "chats" not in st.session_state:
-    st.session_state.chats = {user: Chat(USERS[user]["id"], st.session_state.thread_ids[user]) for user in USERS.keys()}
+    st.session_state.chats = {user: Chat(USERS[user]["id"], str(uuid.uuid4())) for user in USERS.keys()}
 
 st.title("MemGPT Chat Demo")
 
@@ -42,15 +96,14 @@ selected_user = st.sidebar.selectbox(
     format_func=lambda x: f"{USERS[x]['icon']} {x.capitalize()}",
 )
 
-if st.session_state.previous_user != selected_user:
-    st.session_state.thread_ids[selected_user] = str(uuid.uuid4())
-    st.session_state.chats[selected_user] = Chat(USERS[selected_user]["id"], st.session_state.thread_ids[selected_user])
-    st.session_state.chat_history = []
-    st.session_state.previous_user = selected_user
-    st.rerun()
+if st.sidebar.button("New conversation"):
+    st.session_state.chats[selected_user] = Chat(USERS[selected_user]["id"], str(uuid.uuid4()))
+    st.session_state.chat_histories[selected_user] = []
+
+chat_history = st.session_state.chat_histories[selected_user]
 
 # Display current user's chat history
-for message in st.session_state.chat_history:
+for message in chat_history:
     with st.chat_message(message["role"]):
         st.markdown(message["content"])
 
@@ -60,23 +113,11 @@ if prompt := st.chat_input(f"Message {USERS[selected_user]['icon']} {selected_us
         st.markdown(prompt)
 
     # Add user message to current user's chat history
-    st.session_state.chat_history.append({"role": "user", "content": prompt})
-
-    # Function to handle streaming response
-    async def generate_response():
-        response_text = ""
-        # Display assistant message container
-        with st.chat_message("assistant"):
-            message_placeholder = st.empty()
-            # Stream the response
-            async for token in st.session_state.chats[selected_user].stream_response(prompt):
-                response_text += token
-                message_placeholder.markdown(response_text + "▌")
-                await asyncio.sleep(0.01)  # Small sleep to allow UI to update
-            message_placeholder.markdown(response_text)
-
-        # Add assistant response to chat history
-        st.session_state.chat_history.append({"role": "assistant", "content": response_text})
-
-    # Run the async function to get and display the streaming response
-    asyncio.run(generate_response())
+    chat_history.append({"role": "user", "content": prompt})
+
+    # Display assistant message container and stream the response into it
+    with st.chat_message("assistant"):
+        response_text = stream_response(st.session_state.chats[selected_user], prompt, st.empty())
+
+    # Add assistant response to chat history
+    chat_history.append({"role": "assistant", "content": response_text})
@@ -0,0 +1,101 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from lang_memgpt_local._batching import MicroBatcher
+
+
+def test_concurrent_items_are_batched_up_to_max_batch_size():
+    batch_sizes = []
+
+    def fn(items):
+        batch_sizes.append(len(items))
+        time.sleep(0.01)
+        return [x * 2 for x in items]
+
+    batcher = MicroBatcher(fn, max_batch_size=8, max_wait_ms=20, max_workers=1)
+    results = [None] * 50
+
+    def call(i):
+        results[i] = batcher(i)
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(50)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == [i * 2 for i in range(50)]
+    assert max(batch_sizes) == 8
+    assert sum(batch_sizes) == 50
+    stats = batcher.stats()
+    assert stats["items"] == 50
+    assert stats["batches"] == len(batch_sizes)
+    assert stats["mean_batch_size"] == pytest.approx(50 / len(batch_sizes))
+
+
+async def test_async_callers_are_batched():
+    batch_sizes = []
+
+    def fn(items):
+        batch_sizes.append(len(items))
+        return [x + 1 for x in items]
+
+    batcher = MicroBatcher(fn, max_batch_size=4, max_wait_ms=50)
+    assert await asyncio.gather(*(batcher.acall(i) for i in range(4))) == [1, 2, 3, 4]
+    assert batch_sizes == [4]
+
+
+def test_errors_propagate_to_every_caller():
+    def fn(items):
+        raise ValueError("boom")
+
+    batcher = MicroBatcher(fn, max_batch_size=4, max_wait_ms=20)
+    futures = [batcher.submit(i) for i in range(3)]
+    for fut in futures:
+        with pytest.raises(ValueError, match="boom"):
+            fut.result(timeout=5)
+
+
+def test_wrong_result_count_fails_instead_of_hanging():
+    batcher = MicroBatcher(lambda items: [], max_batch_size=2, max_wait_ms=1)
+    with pytest.raises(ValueError, match="Expected 1 results"):
+        batcher.submit("x").result(timeout=5)
+
+
+def test_batcher_keeps_working_after_an_error():
+    batcher = MicroBatcher(lambda items: [1 / x for x in items], max_batch_size=1, max_wait_ms=0)
+    with pytest.raises(ZeroDivisionError):
+        batcher(0)
+    assert batcher(2) == 0.5
+
+
+@pytest.mark.parametrize("cancel_while", ["queued", "running"])
+async def test_cancelled_acall_does_not_block_the_rest_of_its_batch(cancel_while):
+    batches = []
+    running = threading.Event()
+
+    def fn(items):
+        batches.append(list(items))
+        running.set()
+        time.sleep(0.05)
+        return [x * 10 for x in items]
+
+    batcher = MicroBatcher(fn, max_batch_size=8, max_wait_ms=100)
+    cancelled = asyncio.ensure_future(batcher.acall(1))
+    other = asyncio.ensure_future(batcher.acall(2))
+    sync_fut = batcher.submit(3)
+    if cancel_while == "queued":
+        await asyncio.sleep(0.01)
+    else:
+        await asyncio.to_thread(running.wait, 5)
+    cancelled.cancel()
+
+    assert await asyncio.wait_for(other, 5) == 20
+    assert await asyncio.to_thread(sync_fut.result, 5) == 30
+    with pytest.raises(asyncio.CancelledError):
+        await cancelled
+    assert [sorted(b) for b in batches] == ([[2, 3]] if cancel_while == "queued" else [[1, 2, 3]])
+    assert batcher.stats()["batches"] == 1
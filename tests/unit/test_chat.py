@@ -0,0 +1,97 @@
+import asyncio
+from typing import List, Optional
+
+import pytest
+from benchmark_streaming import StreamingFakeChatModel, build_graph
+from langchain_core.messages import AIMessage, AnyMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import tool
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import END, START, StateGraph, add_messages
+from typing_extensions import Annotated, TypedDict
+
+from lang_memgpt_local import _constants as constants
+from lang_memgpt_local.chat import Chat
+
+
+class State(TypedDict):
+    messages: Annotated[List[AnyMessage], add_messages]
+    final_response: Optional[str]
+
+
+def fake_model(text: str) -> StreamingFakeChatModel:
+    return StreamingFakeChatModel(messages=iter([AIMessage(content=text)]))
+
+
+@tool
+def lookup(query: str) -> str:
+    """Look something up."""
+    return f"found {query}"
+
+
+def build_test_graph(after_response=None):
+    """Agent LLM and tool node followed by a tagged response LLM, with distinct texts."""
+
+    async def agent_llm(state: State, config: RunnableConfig):
+        message = await fake_model("agent thinking").ainvoke(state["messages"], config)
+        await lookup.ainvoke({"query": "tea"}, config)
+        return {"messages": message}
+
+    async def response_llm(state: State, config: RunnableConfig):
+        llm = fake_model("the answer").with_config(tags=[constants.RESPONSE_STREAM_TAG])
+        response = await llm.ainvoke(state["messages"], config)
+        if after_response is not None:
+            await after_response()
+        return {"final_response": response.content}
+
+    builder = StateGraph(State)
+    builder.add_node("agent_llm", agent_llm)
+    builder.add_node("response_llm", response_llm)
+    builder.add_edge(START, "agent_llm")
+    builder.add_edge("agent_llm", "response_llm")
+    builder.add_edge("response_llm", END)
+    return builder.compile(checkpointer=MemorySaver())
+
+
+@pytest.mark.parametrize("stream_mode", ["tokens", "events"])
+async def test_only_response_tokens_are_streamed(stream_mode):
+    chat = Chat("user", "thread", stream_mode=stream_mode, graph=build_test_graph())
+    tokens = [tok async for tok in chat.stream_response("hi")]
+    assert "".join(tokens) == "the answer"
+    assert chat.tool_outputs[0][0] == "lookup"
+    assert "found tea" in str(chat.tool_outputs[0][1])
+
+
+async def test_benchmark_graph_streams_one_response_worth_of_tokens():
+    chat = Chat("user", "thread", graph=build_graph(5))
+    assert await chat("hi") == " ".join(f"tok{i}" for i in range(5))
+
+
+async def test_graph_errors_reach_the_caller():
+    async def fail():
+        raise ValueError("boom")
+
+    chat = Chat("user", "thread", graph=build_test_graph(after_response=fail))
+    tokens = []
+    with pytest.raises(ValueError, match="boom"):
+        async for tok in chat.stream_response("hi"):
+            tokens.append(tok)
+    assert "".join(tokens) == "the answer"
+
+
+async def test_closing_the_stream_early_cancels_the_graph():
+    finished = asyncio.Event()
+
+    async def finish():
+        finished.set()
+
+    graph = build_test_graph(after_response=finish)
+    chat = Chat("user", "thread", graph=graph)
+    stream = chat.stream_response("hi")
+    assert await stream.__anext__() == "the"
+    await stream.aclose()
+    await asyncio.sleep(0.1)
+
+    assert not finished.is_set()
+    state = await graph.aget_state({"configurable": {"thread_id": "thread"}})
+    assert not state.values.get("final_response")
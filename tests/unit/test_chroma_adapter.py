@@ -0,0 +1,69 @@
+import random
+import uuid
+from unittest.mock import MagicMock, patch
+
+import chromadb
+import pytest
+
+from lang_memgpt_local import _constants as constants
+from lang_memgpt_local.adapters.chroma import ChromaAdapter
+
+
+def recall_where(user_id: str) -> dict:
+    return {"$and": [{"user_id": {"$eq": user_id}}, {constants.TYPE_KEY: {"$eq": "recall"}}]}
+
+
+def random_vector(rng: random.Random) -> list:
+    return [rng.uniform(-1, 1) for _ in range(8)]
+
+
+@pytest.fixture
+def adapter():
+    with patch("chromadb.PersistentClient", lambda path: chromadb.EphemeralClient()):
+        adapter = ChromaAdapter("unused")
+    # The ephemeral client is shared across the process, so use a fresh collection per test
+    adapter.collections["memories"] = adapter.client.create_collection(f"memories-{uuid.uuid4()}")
+    rng = random.Random(0)
+    for user in range(6):
+        for n in range(8):
+            metadata = {
+                constants.PAYLOAD_KEY: f"user-{user} memory {n}",
+                constants.TYPE_KEY: "recall",
+                "user_id": f"user-{user}",
+            }
+            adapter.add_memory(f"{user}-{n}", random_vector(rng), metadata, metadata[constants.PAYLOAD_KEY])
+    return adapter
+
+
+def test_distinct_users_share_one_query(adapter):
+    rng = random.Random(1)
+    vectors = [random_vector(rng) for _ in range(6)]
+    wheres = [recall_where(f"user-{i}") for i in range(6)]
+    expected = [adapter.query_memories(v, w, 3) for v, w in zip(vectors, wheres)]
+
+    collection = adapter.collections["memories"] = MagicMock(wraps=adapter.collections["memories"])
+    results = adapter.query_memories_batch(vectors, wheres, [3] * 6)
+
+    assert collection.query.call_count == 1
+    assert results == expected
+    for i, metadatas in enumerate(results):
+        assert all(m["user_id"] == f"user-{i}" for m in metadatas)
+
+
+def test_crowded_out_caller_falls_back_to_its_own_query(adapter):
+    # user-0's query vector sits right on user-1's memories
+    target = adapter.collections["memories"].get(ids=["1-0"], include=["embeddings"])["embeddings"][0]
+    vectors = [target, target]
+    wheres = [recall_where("user-0"), recall_where("user-1")]
+    expected = [adapter.query_memories(v, w, 5) for v, w in zip(vectors, wheres)]
+
+    collection = adapter.collections["memories"] = MagicMock(wraps=adapter.collections["memories"])
+    assert adapter.query_memories_batch(vectors, wheres, [5, 1]) == [expected[0], expected[1][:1]]
+    assert collection.query.call_count == 2
+
+
+def test_filters_without_a_user_are_queried_as_is(adapter):
+    rng = random.Random(2)
+    vector = random_vector(rng)
+    where = {constants.TYPE_KEY: {"$eq": "recall"}}
+    assert adapter.query_memories_batch([vector], [where], [4]) == [adapter.query_memories(vector, where, 4)]
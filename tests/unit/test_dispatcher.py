@@ -0,0 +1,183 @@
+import asyncio
+import itertools
+import queue
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from lang_memgpt_local import _settings as settings
+from lang_memgpt_local.dispatcher import HashRing, WorkerPool
+
+USERS = [f"user-{i}" for i in range(10000)]
+
+
+def test_hash_ring_spreads_keys_over_nodes():
+    ring = HashRing([f"w{i}" for i in range(4)])
+    owners = [ring.get(user) for user in USERS]
+    for node in ring.nodes:
+        assert 0.15 < owners.count(node) / len(USERS) < 0.35
+
+
+def test_adding_a_node_moves_about_one_nth_of_keys_to_it():
+    ring = HashRing([f"w{i}" for i in range(4)])
+    before = {user: ring.get(user) for user in USERS}
+    grown = ring.copy()
+    grown.add("w4")
+
+    moved = [user for user in USERS if grown.get(user) != before[user]]
+    assert 0.1 < len(moved) / len(USERS) < 0.3
+    assert all(grown.get(user) == "w4" for user in moved)
+
+    grown.remove("w4")
+    assert all(grown.get(user) == before[user] for user in USERS)
+
+
+def test_empty_hash_ring_raises():
+    with pytest.raises(LookupError):
+        HashRing().get("user")
+
+
+def test_pool_rejects_local_vector_store():
+    with patch.object(settings.SETTINGS, "vectordb_class", "lang_memgpt_local.adapters.chroma.ChromaAdapter"):
+        with pytest.raises(ValueError, match="ChromaHttpAdapter"):
+            WorkerPool(2)
+
+
+class FakeWorker:
+    """In-process stand-in for a worker, answering RPCs on the event loop."""
+
+    def __init__(self, name: str, pool: WorkerPool):
+        self.name = name
+        self.pool = pool
+        self.alive = True
+        self.process = SimpleNamespace(is_alive=lambda: self.alive, join=lambda timeout=None: None)
+        self.inbox = SimpleNamespace(put=self._put)
+        self.received = []
+        self.die_on_export = False
+
+    def _put(self, msg):
+        op, req_id, payload = msg
+        self.received.append((op, payload))
+        if op == "export" and self.die_on_export:
+            self.alive = False
+            asyncio.get_running_loop().call_soon(self.pool._fail_worker, self.name)
+            return
+        result = {thread_id: {"messages": []} for thread_id in payload} if op == "export" else None
+        asyncio.get_running_loop().call_soon(self.pool._deliver, ("done", req_id, result))
+
+    def stop(self):
+        self.alive = False
+
+
+@pytest.fixture
+def pool():
+    with patch.object(settings.SETTINGS, "vectordb_class", "lang_memgpt_local.adapters.chroma.ChromaHttpAdapter"):
+        pool = WorkerPool(2, replicas=50)
+    names = itertools.count()
+
+    def spawn():
+        worker = FakeWorker(f"worker-{next(names)}", pool)
+        pool._workers[worker.name] = worker
+        return worker
+
+    pool._spawn = spawn
+    return pool
+
+
+async def test_rebalance_moves_threads_and_their_users(pool):
+    await pool.start()
+    for i in range(200):
+        await pool.chat(f"user-{i}", f"thread-{i}", "hi")
+
+    new = await pool.add_worker()
+    imports = [payload for op, payload in pool._workers[new].received if op == "import"]
+    assert imports
+    moved_threads = set().union(*(states.keys() for states, _ in imports))
+    moved_users = set().union(*(users for _, users in imports))
+    assert moved_threads == {f"thread-{i}" for i in range(200) if pool.owner(f"user-{i}") == new}
+    assert moved_users == {f"user-{i}" for i in range(200) if pool.owner(f"user-{i}") == new}
+
+
+async def test_new_user_of_a_moving_range_waits_for_the_rebalance(pool):
+    await pool.start()
+    ring = pool._ring.copy()
+    ring.add("worker-2")
+    busy, new = [user for user in USERS if ring.get(user) == "worker-2"][:2]
+
+    async with pool._route(busy, "busy-thread"):
+        rebalance = asyncio.create_task(pool.add_worker())
+        await asyncio.sleep(0.01)
+        chat = asyncio.create_task(pool.chat(new, "new-thread", "hi"))
+        await asyncio.sleep(0.01)
+        assert not chat.done()
+    await asyncio.wait_for(asyncio.gather(rebalance, chat), 5)
+
+    assert ("chat", (new, "new-thread", "hi")) in pool._workers["worker-2"].received
+    assert not any(op == "chat" for name in ("worker-0", "worker-1") for op, _ in pool._workers[name].received)
+
+
+async def test_source_worker_dying_mid_migration_does_not_abort_rebalance(pool):
+    await pool.start()
+    for i in range(200):
+        await pool.chat(f"user-{i}", f"thread-{i}", "hi")
+    pool._workers["worker-0"].die_on_export = True
+
+    new = await pool.add_worker()
+    assert pool._ring.nodes == {"worker-1", new}
+    assert any(op == "import" for op, _ in pool._workers[new].received)
+
+
+async def test_import_invalidates_snapshots_of_moved_users(monkeypatch):
+    from langchain_core.messages import HumanMessage
+
+    from lang_memgpt_local import _snapshots as snapshots
+    from lang_memgpt_local.dispatcher import _serve
+
+    monkeypatch.setenv("TAVILY_API_KEY", "unused")
+    with patch("langchain.hub.pull"):  # The prompts are not used here
+        from lang_memgpt_local.graph import memgraph
+    store = snapshots.RecallSnapshots(drift_threshold=0.05, max_threads=10)
+    monkeypatch.setattr(snapshots, "RECALL_SNAPSHOTS", store)
+    store.put("thread-a", "user-a", [1.0], [{"content": "stale"}], store.version("user-a"))
+    store.put("thread-b", "user-b", [1.0], [{"content": "kept"}], store.version("user-b"))
+
+    inbox, outbox = queue.Queue(), queue.Queue()
+    states = {"moved-thread": {"messages": [HumanMessage(content="hi")]}}
+    inbox.put(("import", 1, (states, ["user-a"])))
+    inbox.put(("stop", None, None))
+    await asyncio.wait_for(_serve(inbox, outbox), 10)
+
+    assert outbox.get_nowait() == ("done", 1, None)
+    assert store.get("thread-a", "user-a", [1.0]) is None
+    assert store.get("thread-b", "user-b", [1.0]) == [{"content": "kept"}]
+    state = await memgraph.aget_state({"configurable": {"thread_id": "moved-thread"}})
+    assert [m.content for m in state.values["messages"]] == ["hi"]
+
+
+async def test_concurrent_rebalances_keep_every_worker(pool):
+    await pool.start()
+    for i in range(50):
+        await pool.chat(f"user-{i}", f"thread-{i}", "hi")
+    names = await asyncio.gather(pool.add_worker(), pool.add_worker())
+    assert pool._ring.nodes == {"worker-0", "worker-1", *names}
+
+
+async def test_dead_worker_leaves_the_ring_and_fails_fast(pool):
+    await pool.start()
+    dead = pool._workers["worker-0"]
+    dead.alive = False
+    pool._fail_worker("worker-0")
+
+    assert pool._ring.nodes == {"worker-1"}
+    assert all(pool.owner(user) == "worker-1" for user in USERS[:100])
+    with pytest.raises(RuntimeError, match="not running"):
+        await pool._rpc(dead, "export", [])
+
+
+async def test_tracked_threads_are_bounded(pool):
+    pool.max_tracked_threads = 10
+    await pool.start()
+    for i in range(25):
+        await pool.chat("user", f"thread-{i}", "hi")
+    assert list(pool._threads) == [f"thread-{i}" for i in range(15, 25)]
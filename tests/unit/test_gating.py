@@ -0,0 +1,59 @@
+import pytest
+
+from lang_memgpt_local._gating import GateDecision, RetrievalGate
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("hi", GateDecision(False, False, "small_talk")),
+        ("Thanks!", GateDecision(False, False, "small_talk")),
+        ("hey, thank you", GateDecision(False, False, "small_talk")),
+        ("yes", GateDecision(False, True, "reply")),
+        ("Sure, please do", GateDecision(False, True, "reply")),
+        ("ok thank you", GateDecision(False, True, "reply")),
+        ("no", GateDecision(False, True, "reply")),
+        ("Lunar", GateDecision(False, True, "short")),
+        ("Remember me?", GateDecision(True, True, "retrieve")),
+        ("What do I like?", GateDecision(True, True, "retrieve")),
+        ("I went to the beach with my friends today.", GateDecision(True, True, "retrieve")),
+        ("", GateDecision(False, False, "empty")),
+    ],
+)
+def test_decide(text, expected):
+    assert RetrievalGate()._decide(text) == expected
+
+
+def test_classifier_can_veto_retrieval():
+    gate = RetrievalGate(classifier="builtins.len", threshold=100)
+    assert gate._decide("What do I like?") == GateDecision(False, True, "classifier")
+
+
+def test_decisions_are_counted():
+    gate = RetrievalGate()
+    for text in ["hi", "yes", "What do I like?", "hello"]:
+        gate(text)
+    assert gate.stats() == {"small_talk": 2, "reply": 1, "retrieve": 1}
+
+
+@pytest.mark.parametrize(
+    "content, expected",
+    [
+        ("thanks", "thanks"),
+        ([{"type": "text", "text": "hi"}], "hi"),
+        ([{"type": "image_url", "image_url": {"url": "data:"}}, {"type": "text", "text": "thanks"}], "thanks"),
+        (["hey", {"type": "text", "text": "thanks"}], "hey thanks"),
+    ],
+)
+def test_last_human_text_keeps_only_text_parts(monkeypatch, content, expected):
+    import importlib
+    from unittest.mock import patch
+
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    monkeypatch.setenv("TAVILY_API_KEY", "unused")
+    with patch("langchain.hub.pull"):  # The prompts are not used here
+        graph = importlib.import_module("lang_memgpt_local.graph")
+    text = graph._last_human_text([HumanMessage(content=content), AIMessage(content="Hello!")])
+    assert text == expected
+    assert RetrievalGate()._decide(text).reason == "small_talk"
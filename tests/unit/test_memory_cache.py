@@ -0,0 +1,70 @@
+import logging
+
+from lang_memgpt_local import _constants as constants
+from lang_memgpt_local._memory_cache import MemoryCache, is_ref
+
+CORE_PATH = constants.PATCH_PATH.format(user_id="user")
+
+
+def recall_result(memory_id: str, memory: str) -> dict:
+    return {
+        constants.PAYLOAD_KEY: memory,
+        constants.PATH_KEY: constants.INSERT_PATH.format(user_id="user", event_id=memory_id),
+    }
+
+
+def fail(*args):
+    raise AssertionError("unexpected database load")
+
+
+def test_refs_round_trip_through_the_cache():
+    cache = MemoryCache(load_core=fail, load_recall=fail)
+    core_ref = cache.core_ref("user", CORE_PATH, {"name": "Luna"})
+    recall_ref = cache.recall_ref("user", [recall_result("e1", "likes chocolate"), recall_result("e2", "has a dog")])
+
+    assert is_ref(core_ref) and is_ref(recall_ref)
+    assert recall_ref["ids"] == ["e1", "e2"]
+    assert cache.resolve_core(core_ref) == {"name": "Luna"}
+    assert cache.resolve_recall(recall_ref) == ["likes chocolate", "has a dog"]
+
+
+def test_inline_values_pass_through():
+    cache = MemoryCache(load_core=fail, load_recall=fail)
+    assert cache.resolve_core({"name": "Luna"}) == {"name": "Luna"}
+    assert cache.resolve_recall(["likes chocolate"]) == ["likes chocolate"]
+
+
+def test_core_miss_reloads_latest_on_version_mismatch(caplog):
+    loads = []
+
+    def load_core(user_id):
+        loads.append(user_id)
+        return CORE_PATH, {"name": "Lunar"}
+
+    ref = MemoryCache(load_core=fail, load_recall=fail).core_ref("user", CORE_PATH, {"name": "Luna"})
+    cache = MemoryCache(load_core=load_core, load_recall=fail)
+    with caplog.at_level(logging.WARNING, logger="memory"):
+        assert cache.resolve_core(ref) == {"name": "Lunar"}
+    assert loads == ["user"]
+    assert "changed since they were loaded" in caplog.text
+
+
+def test_evicted_recall_memories_are_reloaded():
+    requested = []
+
+    def load_recall(ids):
+        requested.append(ids)
+        return {"e1": "likes chocolate", "e3": "reloaded"}
+
+    cache = MemoryCache(load_core=fail, load_recall=load_recall, max_entries=2)
+    ref = cache.recall_ref("user", [recall_result(f"e{i}", f"memory {i}") for i in range(1, 4)])
+
+    # e1 was evicted by e2 and e3, the stored e2 is still cached
+    assert cache.resolve_recall(ref) == ["likes chocolate", "memory 2", "memory 3"]
+    assert requested == [["e1"]]
+
+
+def test_recall_memories_missing_from_the_database_are_dropped():
+    cache = MemoryCache(load_core=fail, load_recall=lambda ids: {}, max_entries=1)
+    ref = cache.recall_ref("user", [recall_result("e1", "gone"), recall_result("e2", "kept")])
+    assert cache.resolve_recall(ref) == ["kept"]
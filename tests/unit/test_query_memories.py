@@ -0,0 +1,52 @@
+import asyncio
+import importlib
+
+import pytest
+
+from lang_memgpt_local._batching import MicroBatcher
+
+
+class FakeAdapter:
+    def __init__(self):
+        self.batches = []
+
+    def query_memories_batch(self, vectors, wheres, n_results):
+        self.batches.append([where["user_id"] for where in wheres])
+        return [[{"user_id": where["user_id"], "top_k": n}] for where, n in zip(wheres, n_results)]
+
+
+@pytest.fixture
+def tools(monkeypatch):
+    monkeypatch.setenv("TAVILY_API_KEY", "unused")
+    tools = importlib.import_module("lang_memgpt_local.tools")
+    monkeypatch.setattr(tools, "db_adapter", FakeAdapter())
+    monkeypatch.setattr(tools, "_query_batcher", MicroBatcher(tools._query_memories_batch, max_wait_ms=100))
+    return tools
+
+
+async def test_cancelled_search_does_not_block_other_users(tools):
+    leader = asyncio.ensure_future(tools.aquery_memories([0.1], {"user_id": "a"}, 5))
+    await asyncio.sleep(0.01)
+    follower = asyncio.ensure_future(tools.aquery_memories([0.1], {"user_id": "a"}, 5))
+    other = asyncio.ensure_future(tools.aquery_memories([0.2], {"user_id": "b"}, 5))
+    await asyncio.sleep(0.01)
+    leader.cancel()
+
+    assert await asyncio.wait_for(other, 5) == [{"user_id": "b", "top_k": 5}]
+    # The follower of the cancelled search takes over and runs it again
+    assert await asyncio.wait_for(follower, 5) == [{"user_id": "a", "top_k": 5}]
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+    assert sorted(user for batch in tools.db_adapter.batches for user in batch) == ["a", "b"]
+
+
+def test_sync_and_async_searches_share_the_batcher(tools):
+    async def search(user_id):
+        return await tools.aquery_memories([0.3], {"user_id": user_id}, 3)
+
+    async def main():
+        sync = asyncio.to_thread(tools.query_memories, [0.4], {"user_id": "c"}, 3)
+        return await asyncio.gather(search("d"), sync)
+
+    assert asyncio.run(main()) == [[{"user_id": "d", "top_k": 3}], [{"user_id": "c", "top_k": 3}]]
+    assert [sorted(batch) for batch in tools.db_adapter.batches] == [["c", "d"]]
@@ -0,0 +1,133 @@
+import asyncio
+import threading
+
+import pytest
+
+from lang_memgpt_local._singleflight import SingleFlight
+
+
+async def test_concurrent_async_calls_share_one_call():
+    flight = SingleFlight()
+    calls = 0
+    release = asyncio.Event()
+
+    async def fn(x):
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return x * 2
+
+    tasks = [asyncio.create_task(flight.ado("key", fn, 21)) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+    assert await asyncio.gather(*tasks) == [42] * 5
+    assert calls == 1
+
+
+async def test_sync_leader_shared_with_async_follower():
+    flight = SingleFlight()
+    calls = 0
+    started, release = threading.Event(), threading.Event()
+
+    def fn():
+        nonlocal calls
+        calls += 1
+        started.set()
+        release.wait(5)
+        return "result"
+
+    leader = asyncio.create_task(asyncio.to_thread(flight.do, "key", fn))
+    await asyncio.to_thread(started.wait, 5)
+    follower = asyncio.create_task(flight.ado("key", fn))
+    await asyncio.sleep(0.01)
+    release.set()
+    assert await asyncio.gather(leader, follower) == ["result", "result"]
+    assert calls == 1
+
+
+async def test_async_leader_shared_with_sync_follower():
+    flight = SingleFlight()
+    calls = 0
+    release = asyncio.Event()
+
+    async def fn():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return "result"
+
+    leader = asyncio.create_task(flight.ado("key", fn))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(asyncio.to_thread(flight.do, "key", lambda: "not shared"))
+    await asyncio.sleep(0.01)
+    release.set()
+    assert await asyncio.gather(leader, follower) == ["result", "result"]
+    assert calls == 1
+
+
+async def test_cancelled_leader_hands_over_to_follower():
+    flight = SingleFlight()
+    calls = 0
+    release = asyncio.Event()
+
+    async def fn():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return calls
+
+    leader = asyncio.create_task(flight.ado("key", fn))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flight.ado("key", fn))
+    await asyncio.sleep(0)
+    leader.cancel()
+    await asyncio.sleep(0)
+    release.set()
+
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+    assert await follower == 2
+    assert calls == 2
+
+
+async def test_cancelled_follower_does_not_affect_leader():
+    flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def fn():
+        await release.wait()
+        return "result"
+
+    leader = asyncio.create_task(flight.ado("key", fn))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flight.ado("key", fn))
+    other = asyncio.create_task(flight.ado("key", fn))
+    await asyncio.sleep(0)
+    follower.cancel()
+    release.set()
+
+    assert await leader == "result"
+    assert await other == "result"
+    with pytest.raises(asyncio.CancelledError):
+        await follower
+
+
+async def test_errors_are_shared_with_followers():
+    flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def fn():
+        await release.wait()
+        raise ValueError("boom")
+
+    tasks = [asyncio.create_task(flight.ado("key", fn)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+def test_sync_calls_after_completion_run_again():
+    flight = SingleFlight()
+    assert flight.do("key", lambda: 1) == 1
+    assert flight.do("key", lambda: 2) == 2
@@ -0,0 +1,119 @@
+import importlib
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from lang_memgpt_local import _snapshots as snapshots
+from lang_memgpt_local import _utils as utils
+from lang_memgpt_local._snapshots import RecallSnapshots
+
+RESULTS = [{"content": "likes tea"}]
+
+
+@pytest.fixture
+def store():
+    return RecallSnapshots(drift_threshold=0.05, max_threads=3)
+
+
+def test_snapshot_is_reused_within_drift_threshold(store):
+    store.put("t1", "u1", [1.0, 0.0], RESULTS, store.version("u1"))
+    # Cosine distance of about 0.005
+    assert store.get("t1", "u1", [1.0, 0.1]) == RESULTS
+
+
+def test_snapshot_is_requeried_once_the_conversation_drifts(store):
+    store.put("t1", "u1", [1.0, 0.0], RESULTS, store.version("u1"))
+    # Cosine distance of about 0.29
+    assert store.get("t1", "u1", [1.0, 1.0]) is None
+
+
+def test_write_between_version_read_and_put_forces_a_requery(store):
+    version = store.version("u1")
+    store.invalidate_user("u1")  # A memory saved while the query was running
+    store.put("t1", "u1", [1.0, 0.0], RESULTS, version)
+    assert store.get("t1", "u1", [1.0, 0.0]) is None
+
+
+def test_least_recently_used_thread_is_evicted(store):
+    for thread_id in ("t1", "t2", "t3"):
+        store.put(thread_id, "u1", [1.0, 0.0], RESULTS, store.version("u1"))
+    assert store.get("t1", "u1", [1.0, 0.0]) == RESULTS  # t2 is now the least recent
+    store.put("t4", "u1", [1.0, 0.0], RESULTS, store.version("u1"))
+    assert store.get("t2", "u1", [1.0, 0.0]) is None
+    for thread_id in ("t1", "t3", "t4"):
+        assert store.get(thread_id, "u1", [1.0, 0.0]) == RESULTS
+
+
+def test_snapshot_does_not_leak_across_users_sharing_a_thread_id(store):
+    store.put("t1", "u1", [1.0, 0.0], RESULTS, store.version("u1"))
+    assert store.get("t1", "u2", [1.0, 0.0]) is None
+    store.invalidate_user("u2")
+    assert store.get("t1", "u1", [1.0, 0.0]) == RESULTS
+
+
+class FakeEmbeddings:
+    async def aembed_query(self, text):
+        return [1.0, 0.0]
+
+
+async def test_save_recall_memory_invalidates_the_users_snapshots(monkeypatch):
+    monkeypatch.setenv("TAVILY_API_KEY", "unused")
+    tools = importlib.import_module("lang_memgpt_local.tools")
+    store = RecallSnapshots(drift_threshold=0.05, max_threads=10)
+    monkeypatch.setattr(snapshots, "RECALL_SNAPSHOTS", store)
+    monkeypatch.setattr(utils, "get_embeddings", FakeEmbeddings)
+    monkeypatch.setattr(tools, "db_adapter", MagicMock())
+    store.put("t1", "u1", [1.0, 0.0], RESULTS, store.version("u1"))
+    store.put("t2", "u2", [1.0, 0.0], RESULTS, store.version("u2"))
+
+    config = {"configurable": {"user_id": "u1", "thread_id": "t1"}}
+    await tools.save_recall_memory.ainvoke({"memory": "likes coffee now"}, config)
+
+    tools.db_adapter.add_memory.assert_called_once()
+    assert store.get("t1", "u1", [1.0, 0.0]) is None
+    assert store.get("t2", "u2", [1.0, 0.0]) == RESULTS
+
+
+class FakeQueries:
+    """Counts recall queries, optionally saving a memory while one is running."""
+
+    def __init__(self, store, write_during_query=False):
+        self.store = store
+        self.write_during_query = write_during_query
+        self.calls = 0
+
+    def __call__(self, user_id, vector, top_k=5):
+        self.calls += 1
+        if self.write_during_query:
+            self.write_during_query = False
+            self.store.invalidate_user(user_id)
+        return RESULTS
+
+
+@pytest.fixture
+def graph(monkeypatch):
+    monkeypatch.setenv("TAVILY_API_KEY", "unused")
+    with patch("langchain.hub.pull"):  # The prompts are not used here
+        graph = importlib.import_module("lang_memgpt_local.graph")
+    store = RecallSnapshots(drift_threshold=0.05, max_threads=10)
+    monkeypatch.setattr(snapshots, "RECALL_SNAPSHOTS", store)
+    monkeypatch.setattr(utils, "get_embeddings", lambda: MagicMock(embed_query=lambda text: [1.0, 0.0]))
+    return graph
+
+
+def test_fetch_recall_memories_reuses_the_thread_snapshot(graph, monkeypatch):
+    queries = FakeQueries(snapshots.RECALL_SNAPSHOTS)
+    monkeypatch.setattr(graph, "query_recall_memories", queries)
+    assert graph.fetch_recall_memories("u1", "t1", "hi") == RESULTS
+    assert graph.fetch_recall_memories("u1", "t1", "hi again") == RESULTS
+    assert queries.calls == 1
+
+
+def test_fetch_recall_memories_requeries_after_a_concurrent_write(graph, monkeypatch):
+    queries = FakeQueries(snapshots.RECALL_SNAPSHOTS, write_during_query=True)
+    monkeypatch.setattr(graph, "query_recall_memories", queries)
+    graph.fetch_recall_memories("u1", "t1", "hi")
+    graph.fetch_recall_memories("u1", "t1", "hi")
+    assert queries.calls == 2
+    graph.fetch_recall_memories("u1", "t1", "hi")
+    assert queries.calls == 2